@@ -0,0 +1,237 @@
+import argparse
+import csv
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from uni_registration import EnrollmentSystem
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+DAY_PATTERNS = [["Mon", "Wed"], ["Tue", "Thu"], ["Mon", "Wed", "Fri"], ["Fri"], ["Mon"], ["Wed"]]
+
+
+def generate_dataset(data_dir, students, courses, departments, courses_per_student, meetings_per_day, seed=0):
+    """Write synthetic students.csv, courses.csv and enrollments.csv into data_dir.
+
+    meetings_per_day controls schedule density: course start times are drawn from that many
+    slots per day, so fewer slots means more time conflicts between sections.
+    """
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+    start_minutes = [8 * 60 + i * (10 * 60 // meetings_per_day) for i in range(meetings_per_day)]
+
+    course_rows = []
+    for i in range(courses):
+        start = rng.choice(start_minutes)
+        length = rng.choice([50, 75, 90])
+        course_rows.append([
+            f"C{i:05d}", f"Course {i}", f"Department {i % departments}", f"Dr. Instructor {i % (departments * 8)}",
+            rng.randint(20, 300), rng.choice([1, 2, 3, 4]), ",".join(rng.choice(DAY_PATTERNS)),
+            f"{start // 60:02d}:{start % 60:02d}", f"{(start + length) // 60:02d}:{(start + length) % 60:02d}", ""])
+
+    enrollments = []
+    student_rows = []
+    for i in range(students):
+        student_id = f"Z{i:05d}" if students <= 100000 else f"Z{i:07d}"
+        student_rows.append([student_id, f"Student {i}", "password", f"student{i}@zed.edu",
+                             f"Department {i % departments}", ""])
+        for course_index in rng.sample(range(courses), min(courses_per_student, courses)):
+            enrollments.append((student_id, course_rows[course_index][0]))
+
+    with open(os.path.join(data_dir, "students.csv"), "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["StudentID", "Name", "Password", "Email", "Major", "RegisteredCourses"])
+        writer.writerows(student_rows)
+    with open(os.path.join(data_dir, "courses.csv"), "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["CourseID", "Name", "Department", "Instructor", "MaxStudents", "Credits",
+                         "Days", "StartTime", "EndTime", "EnrolledStudents"])
+        writer.writerows(course_rows)
+    with open(os.path.join(data_dir, "enrollments.csv"), "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["StudentID", "CourseID", "EnrollmentDate"])
+        writer.writerows([student_id, course_id, "2025-01-01"] for student_id, course_id in enrollments)
+    return len(enrollments)
+
+
+def clear_derived_files(data_dir):
+    """Remove everything written by EnrollmentSystem itself so the next load is cold"""
+    for name in ("registration.snapshot", "enrollments.journal", "waitlists.csv", "student_id.counter"):
+        path = os.path.join(data_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def timed(function, repeat=1):
+    """Run function repeat times and return (best seconds, last result)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run_scenarios(data_dir, operations, rng):
+    results = {}
+
+    clear_derived_files(data_dir)
+    seconds, system = timed(lambda: EnrollmentSystem(data_dir=data_dir))
+    results["cold_load_seconds"] = seconds
+    # Keep the loaded dataset heavy enough that conflict and credit checks do real work
+    system.max_credits = 10 ** 6
+    system.compact_limit = 10 ** 9
+
+    seconds, _ = timed(lambda: EnrollmentSystem(data_dir=data_dir), repeat=3)
+    results["warm_load_seconds"] = seconds
+
+    student_ids = list(system.students)
+    course_ids = list(system.courses)
+    pairs = [(rng.choice(student_ids), rng.choice(course_ids)) for _ in range(operations)]
+
+    seconds, outcomes = timed(lambda: [system.enroll_student(s, c)[0] for s, c in pairs])
+    results["enroll_ops_per_second"] = operations / seconds
+    results["enroll_success_rate"] = sum(outcomes) / operations
+
+    seconds, _ = timed(lambda: [system.drop_course(s, c) for s, c in pairs])
+    results["drop_ops_per_second"] = operations / seconds
+
+    system.autocommit = False
+    seconds, _ = timed(lambda: system.enroll_many(pairs))
+    results["enroll_many_ops_per_second"] = operations / seconds
+    system.autocommit = True
+
+    # Conflict checks against the students with the heaviest schedules
+    heavy = sorted(system.students.values(), key=lambda student: len(student.registered_courses), reverse=True)[:100]
+    checks = [(student, system.courses[rng.choice(course_ids)]) for student in heavy for _ in range(100)]
+    seconds, _ = timed(lambda: [student.has_schedule_conflict(course, system.courses) for student, course in checks],
+                       repeat=3)
+    results["conflict_checks_per_second"] = len(checks) / seconds
+    results["heaviest_course_load"] = len(heavy[0].registered_courses) if heavy else 0
+
+    seconds, _ = timed(lambda: [student.get_total_credits(system.courses) for student in system.students.values()])
+    results["credit_totals_per_second"] = len(system.students) / seconds
+
+    seconds, _ = timed(system.save_data)
+    results["save_data_seconds"] = seconds
+
+    clear_derived_files(data_dir)
+    results.update(measure_memory(data_dir))
+    return results
+
+
+def measure_memory(data_dir):
+    """Memory of a cold load, measured in a new interpreter.
+
+    In this process the earlier scenarios have already filled caches such as parse_time's
+    and the interned ID strings, so a load here would not be charged for them.
+    """
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure-memory", data_dir],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def _measure_memory_here(data_dir):
+    gc.collect()
+    tracemalloc.start()
+    system = EnrollmentSystem(data_dir=data_dir)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"memory_bytes": current, "memory_peak_bytes": peak,
+            "memory_bytes_per_student": current / max(len(system.students), 1)}
+
+
+# Metrics where a larger value is better; everything else is a duration or size
+HIGHER_IS_BETTER = {"enroll_ops_per_second", "drop_ops_per_second", "enroll_many_ops_per_second",
+                    "conflict_checks_per_second", "credit_totals_per_second"}
+INFORMATIONAL = {"enroll_success_rate", "heaviest_course_load"}
+
+
+def compare(previous, current, tolerance):
+    """Print each metric against a previous run and return the names that regressed"""
+    regressions = []
+    for name, value in current["results"].items():
+        old = previous.get("results", {}).get(name)
+        if old is None or name in INFORMATIONAL or not old:
+            continue
+        change = (value - old) / old
+        worse = change < -tolerance if name in HIGHER_IS_BETTER else change > tolerance
+        flag = "  REGRESSION" if worse else ""
+        print(f"  {name:32s} {old:14.4f} -> {value:14.4f} ({change:+.1%}){flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Registration-day benchmark for EnrollmentSystem")
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--courses", type=int, default=1000)
+    parser.add_argument("--departments", type=int, default=20)
+    parser.add_argument("--courses-per-student", type=int, default=4)
+    parser.add_argument("--meetings-per-day", type=int, default=8,
+                        help="Distinct start times per day (lower means denser, more conflicting schedules)")
+    parser.add_argument("--operations", type=int, default=2000, help="Enroll/drop operations per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results JSON")
+    parser.add_argument("--compare", metavar="JSON", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Relative change counted as a regression when comparing (default 0.15)")
+    parser.add_argument("--keep-data", metavar="DIR", help="Generate the dataset here and keep it")
+    parser.add_argument("--measure-memory", metavar="DIR", help=argparse.SUPPRESS)  # Used by measure_memory
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.measure_memory:
+        print(json.dumps(_measure_memory_here(args.measure_memory)))
+        raise SystemExit(0)
+    data_dir = args.keep_data or tempfile.mkdtemp(prefix="zed_benchmark_")
+    try:
+        print(f"Generating {args.students} students x {args.courses} courses in {data_dir}...")
+        enrollment_count = generate_dataset(data_dir, args.students, args.courses, args.departments,
+                                            args.courses_per_student, args.meetings_per_day, args.seed)
+        results = run_scenarios(data_dir, args.operations, random.Random(args.seed))
+    finally:
+        if not args.keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "parameters": {
+            "students": args.students, "courses": args.courses, "departments": args.departments,
+            "courses_per_student": args.courses_per_student, "meetings_per_day": args.meetings_per_day,
+            "operations": args.operations, "seed": args.seed, "enrollments": enrollment_count,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+
+    for name, value in results.items():
+        print(f"  {name:32s} {value:14.4f}")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            previous = json.load(file)
+        if previous.get("parameters") != report["parameters"]:
+            print("Warning: comparing runs with different parameters")
+        regressions = compare(previous, report, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metric(s) regressed: {', '.join(regressions)}")
+            raise SystemExit(1)
@@ -0,0 +1,353 @@
+import argparse
+import csv
+import os
+from datetime import datetime
+
+from uni_registration import FileLock
+
+# Which file a (student, course) pair was seen in
+IN_STUDENTS = 1  # students.csv RegisteredCourses
+IN_COURSES = 2  # courses.csv EnrolledStudents
+IN_ENROLLMENTS = 4  # enrollments.csv rows
+SOURCE_NAMES = ((IN_STUDENTS, "students.csv"), (IN_COURSES, "courses.csv"), (IN_ENROLLMENTS, "enrollments.csv"))
+
+POLICIES = {
+    "union": lambda sources: True,  # Keep an enrollment recorded anywhere
+    "majority": lambda sources: bin(sources).count("1") >= 2,  # Keep it if two of the three files agree
+    "enrollments": lambda sources: bool(sources & IN_ENROLLMENTS),  # enrollments.csv is authoritative
+}
+
+
+class RegistrationFiles:
+    """One streaming pass over students.csv, courses.csv and enrollments.csv.
+
+    Student and course IDs are numbered as they are first seen and every enrollment is kept
+    once, as an integer key, in a dict that records which of the three files mention it.
+    Every cross-check is then a hash lookup, so the whole check is linear in the size of
+    the files.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.student_ids = []
+        self.student_index = {}
+        self.course_ids = []
+        self.course_index = {}
+        self.known_students = set()  # Numbers of students with a row in students.csv
+        self.capacity = {}  # course number -> MaxStudents
+        self.pairs = {}  # student number << 32 | course number -> IN_* bits
+        self.dates = {}  # pair key -> EnrollmentDate from enrollments.csv
+        self.waitlisted = {}  # pair key -> waitlists.csv row, first occurrence only
+        self.journal_records = 0  # Complete records in enrollments.journal not yet folded into the CSVs
+        self.issues = []  # (issue, student_id, course_id, detail)
+
+    def _number(self, ids, index, value):
+        number = index.get(value)
+        if number is None:
+            number = index[value] = len(ids)
+            ids.append(value)
+        return number
+
+    def _student(self, student_id):
+        return self._number(self.student_ids, self.student_index, student_id)
+
+    def _course(self, course_id):
+        return self._number(self.course_ids, self.course_index, course_id)
+
+    def _mark(self, student_id, course_id, source):
+        key = self._student(student_id) << 32 | self._course(course_id)
+        seen = self.pairs.get(key, 0)
+        self.pairs[key] = seen | source
+        return key, seen
+
+    def _path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def scan(self):
+        """Read the three files, the waitlists and the journal once each"""
+        self._scan_courses()
+        self._scan_students()
+        self._scan_enrollments()
+        self._scan_waitlists()
+        self._scan_journal()
+        return self
+
+    def _scan_courses(self):
+        path = self._path("courses.csv")
+        if not os.path.exists(path):
+            return
+        with open(path, newline='') as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Skip header
+            for row in reader:
+                if len(row) < 9:
+                    continue
+                course_id = row[0]
+                number = self._course(course_id)
+                if number in self.capacity:
+                    self.issues.append(("duplicate_course", "", course_id, "course listed more than once"))
+                    continue
+                self.capacity[number] = int(row[4]) if row[4] else 30
+                if len(row) >= 10 and row[9]:
+                    for student_id in row[9].split(','):
+                        self._mark(student_id, course_id, IN_COURSES)
+
+    def _scan_students(self):
+        path = self._path("students.csv")
+        if not os.path.exists(path):
+            return
+        with open(path, newline='', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                student_id = row.get('student_id') or row.get('StudentID')
+                if not student_id:
+                    continue
+                number = self._student(student_id)
+                if number in self.known_students:
+                    self.issues.append(("duplicate_student", student_id, "", "student listed more than once"))
+                    continue
+                self.known_students.add(number)
+                registered_courses = row.get('registered_courses') or row.get('RegisteredCourses')
+                if registered_courses:
+                    for course_id in registered_courses.split(','):
+                        self._mark(student_id, course_id, IN_STUDENTS)
+
+    def _scan_enrollments(self):
+        path = self._path("enrollments.csv")
+        if not os.path.exists(path):
+            return
+        with open(path, newline='') as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Skip header
+            for row in reader:
+                if len(row) < 2:
+                    continue
+                key, seen = self._mark(row[0], row[1], IN_ENROLLMENTS)
+                if seen & IN_ENROLLMENTS:
+                    self.issues.append(("duplicate_enrollment", row[0], row[1], "pair listed more than once"))
+                elif len(row) >= 3 and row[2]:
+                    self.dates[key] = row[2]
+
+    def _scan_waitlists(self):
+        path = self._path("waitlists.csv")
+        if not os.path.exists(path):
+            return
+        with open(path, newline='') as file:
+            reader = csv.reader(file)
+            next(reader, None)  # Skip header
+            for row in reader:
+                if len(row) < 4:
+                    continue
+                key = self._student(row[1]) << 32 | self._course(row[0])
+                if key in self.waitlisted:
+                    self.issues.append(("duplicate_waitlist", row[1], row[0], "waitlisted more than once"))
+                    continue
+                self.waitlisted[key] = row
+
+    def _scan_journal(self):
+        """Count the journal records the registration system will replay on top of the CSVs"""
+        path = self._path("enrollments.journal")
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as file:
+            data = file.read()
+        self.journal_records = data[:data.rfind(b"\n") + 1].count(b"\n")
+
+    def check(self, policy="union", trim_overbooked=False):
+        """Report every problem and return the canonical {pair key} set chosen by the policy.
+
+        An enrollment is dropped if its student or course does not exist. A mismatch is an
+        enrollment missing from one or two of the files. With trim_overbooked, courses over
+        capacity keep their earliest enrollments.
+        """
+        keep = POLICIES[policy]
+        canonical = set()
+        enrolled = {}
+        for key, sources in self.pairs.items():
+            student_number, course_number = key >> 32, key & 0xFFFFFFFF
+            student_id, course_id = self.student_ids[student_number], self.course_ids[course_number]
+            if student_number not in self.known_students:
+                self.issues.append(("orphan_student", student_id, course_id, "student does not exist"))
+                continue
+            if course_number not in self.capacity:
+                self.issues.append(("orphan_course", student_id, course_id, "course does not exist"))
+                continue
+            if sources != IN_STUDENTS | IN_COURSES | IN_ENROLLMENTS:
+                missing = [name for bit, name in SOURCE_NAMES if not sources & bit]
+                self.issues.append(("mismatch", student_id, course_id, "missing from " + ", ".join(missing)))
+            if keep(sources):
+                canonical.add(key)
+                enrolled[course_number] = enrolled.get(course_number, 0) + 1
+
+        over = {number: count for number, count in enrolled.items() if count > self.capacity[number]}
+        for number, count in over.items():
+            self.issues.append(("over_capacity", "", self.course_ids[number],
+                                f"{count} enrolled, capacity {self.capacity[number]}"))
+        if trim_overbooked and over:
+            by_course = {number: [] for number in over}
+            for key in canonical:
+                if key & 0xFFFFFFFF in by_course:
+                    by_course[key & 0xFFFFFFFF].append(key)
+            for number, keys in by_course.items():
+                # Earliest enrollment date first; pairs without a date go last
+                keys.sort(key=lambda key: (key not in self.dates, self.dates.get(key, ""), key))
+                for key in keys[self.capacity[number]:]:
+                    canonical.discard(key)
+                    self.issues.append(("trimmed", self.student_ids[key >> 32], self.course_ids[number],
+                                        "dropped to bring the course back to capacity"))
+
+        for key, row in self.waitlisted.items():
+            if key >> 32 not in self.known_students or key & 0xFFFFFFFF not in self.capacity:
+                self.issues.append(("orphan_waitlist", row[1], row[0], "student or course does not exist"))
+            elif key in canonical:
+                self.issues.append(("waitlisted_enrolled", row[1], row[0], "waitlisted for a course they are in"))
+        return canonical
+
+    def write_repaired(self, canonical, out_dir):
+        """Write consistent students.csv, courses.csv and enrollments.csv for the canonical enrollments.
+
+        The original files are streamed again and only the enrollment columns are rewritten;
+        rows keep their order and duplicate rows are dropped. Existing enrollment dates are
+        kept and new ones get today's date. waitlists.csv loses the entries for missing
+        students or courses and for students now enrolled in the course.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        courses_of = {}
+        students_of = {}
+        for key in sorted(canonical):
+            courses_of.setdefault(key >> 32, []).append(key)
+            students_of.setdefault(key & 0xFFFFFFFF, []).append(self.student_ids[key >> 32])
+        today = datetime.now().strftime("%Y-%m-%d")
+
+        # Build each file next to the output and swap it in, so repairing in place is safe
+        def replace(name, write_rows):
+            target = os.path.join(out_dir, name)
+            with open(target + ".tmp", 'w', newline='') as out:
+                write_rows(csv.writer(out))
+            os.replace(target + ".tmp", target)
+
+        def write_students(writer):
+            writer.writerow(["StudentID", "Name", "Password", "Email", "Major", "RegisteredCourses"])
+            written = set()
+            with open(self._path("students.csv"), newline='', encoding='utf-8') as file:
+                for row in csv.DictReader(file):
+                    student_id = row.get('student_id') or row.get('StudentID')
+                    if not student_id or student_id in written:
+                        continue
+                    written.add(student_id)
+                    keys = courses_of.get(self.student_index[student_id], [])
+                    writer.writerow([student_id, row.get('name') or row.get('Name'),
+                                     row.get('password') or row.get('Password'), row.get('email') or row.get('Email'),
+                                     row.get('major') or row.get('Major'),
+                                     ",".join(self.course_ids[key & 0xFFFFFFFF] for key in keys)])
+
+        def write_courses(writer):
+            writer.writerow(["CourseID", "Name", "Department", "Instructor", "MaxStudents", "Credits",
+                             "Days", "StartTime", "EndTime", "EnrolledStudents"])
+            written = set()
+            with open(self._path("courses.csv"), newline='') as file:
+                reader = csv.reader(file)
+                next(reader, None)
+                for row in reader:
+                    if len(row) < 9 or row[0] in written:
+                        continue
+                    written.add(row[0])
+                    writer.writerow(row[:9] + [",".join(students_of.get(self.course_index[row[0]], []))])
+
+        def write_enrollments(writer):
+            writer.writerow(["StudentID", "CourseID", "EnrollmentDate"])
+            for student_number in sorted(courses_of, key=self.student_ids.__getitem__):
+                for key in courses_of[student_number]:
+                    writer.writerow([self.student_ids[student_number], self.course_ids[key & 0xFFFFFFFF],
+                                     self.dates.get(key, today)])
+
+        def write_waitlists(writer):
+            writer.writerow(["CourseID", "StudentID", "Standing", "RequestedAt"])
+            for key, row in self.waitlisted.items():
+                if key >> 32 in self.known_students and key & 0xFFFFFFFF in self.capacity and key not in canonical:
+                    writer.writerow(row[:4])
+
+        if os.path.exists(self._path("students.csv")):
+            replace("students.csv", write_students)
+        if os.path.exists(self._path("courses.csv")):
+            replace("courses.csv", write_courses)
+        replace("enrollments.csv", write_enrollments)
+        if os.path.exists(self._path("waitlists.csv")):
+            replace("waitlists.csv", write_waitlists)
+
+
+def bump_generation(data_dir):
+    """Advance registration.version so running --shared processes reload everything"""
+    version_file = os.path.join(data_dir, "registration.version")
+    try:
+        with open(version_file, 'r') as file:
+            generation = int(file.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        generation = 0
+    temp_file = f"{version_file}.{os.getpid()}.tmp"
+    with open(temp_file, 'w') as file:
+        file.write(str(generation + 1))
+    os.replace(temp_file, version_file)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Cross-check students.csv, courses.csv and enrollments.csv and optionally repair them")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="union",
+                        help="Which enrollments survive a mismatch (default: union, keep any recorded enrollment)")
+    parser.add_argument("--trim-overbooked", action="store_true",
+                        help="Drop the latest enrollments of courses over capacity")
+    parser.add_argument("--report", metavar="CSV", help="Write every issue as Issue,StudentID,CourseID,Detail rows")
+    parser.add_argument("--repair", metavar="DIR",
+                        help="Write the repaired files to DIR (may be the data directory itself)")
+    parser.add_argument("--show", type=int, default=10, help="Examples to print per issue type (default: 10)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    in_place = bool(args.repair) and os.path.abspath(args.repair) == os.path.abspath(args.data_dir)
+    lock = None
+    if in_place:
+        # Keep --shared registration processes out while the files are checked and replaced
+        lock = FileLock(os.path.join(args.data_dir, "registration.lock"))
+        lock.acquire(exclusive=True)
+    try:
+        files = RegistrationFiles(args.data_dir).scan()
+        canonical = files.check(args.policy, args.trim_overbooked)
+
+        counts = {}
+        for issue in files.issues:
+            counts.setdefault(issue[0], []).append(issue)
+        print(f"{len(files.known_students)} students, {len(files.capacity)} courses, "
+              f"{len(files.pairs)} distinct enrollments seen, {len(canonical)} kept")
+        if files.journal_records:
+            print(f"Note: enrollments.journal holds {files.journal_records} record(s) not yet folded into the CSVs; "
+                  f"this check only covers the CSVs.")
+        if not files.issues:
+            print("All three files agree.")
+        for name, issues in sorted(counts.items()):
+            print(f"{name}: {len(issues)}")
+            for _, student_id, course_id, detail in issues[:args.show]:
+                print(f"  {student_id or '-'},{course_id or '-'}: {detail}")
+
+        if args.report:
+            with open(args.report, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(["Issue", "StudentID", "CourseID", "Detail"])
+                writer.writerows(files.issues)
+        if args.repair:
+            if in_place and files.journal_records:
+                # Replaying those records on the next start would undo part of the repair
+                raise SystemExit("Not repairing in place: compact the journal first (start and cleanly stop "
+                                 "the registration system), or --repair into another directory.")
+            files.write_repaired(canonical, args.repair)
+            print(f"Repaired files written to {args.repair}")
+            if in_place:
+                bump_generation(args.data_dir)
+                print("Running --shared registration processes will reload the repaired files on their "
+                      "next operation. Stop any other registration process first: it would write its old data back.")
+    finally:
+        if lock is not None:
+            lock.release()
+    raise SystemExit(1 if files.issues else 0)
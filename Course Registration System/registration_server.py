@@ -0,0 +1,364 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+
+from uni_registration import EnrollmentSystem, Metrics, SQLiteStorage, Student, parse_time
+
+
+class KeyedLocks:
+    """One asyncio lock per key, created on first use and dropped once nobody holds or waits for it.
+
+    A defaultdict of locks would keep a lock for every student and course ever seen.
+    """
+
+    def __init__(self):
+        self._locks = {}  # key -> [lock, requests holding or waiting for it]
+
+    @asynccontextmanager
+    async def hold(self, key):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    def __len__(self):
+        return len(self._locks)
+
+
+class RegistrationServer:
+    """Asyncio front end that lets many clients share one EnrollmentSystem.
+
+    Requests are newline-delimited JSON objects with an "op" field; every reply is one
+    JSON line with "ok" and "message". Enroll, drop and waitlist changes hold a per-student lock and then a
+    per-course lock (always in that order) while they are applied, so no two requests can race
+    on the same seat or the same student's credit total. The locks are released before the reply
+    waits for the grouped commit; records reach the journal in the order they were applied.
+
+    Journal compaction is kept off the request path: once it is due, it runs only after
+    COMPACT_IDLE_SECONDS with no request in flight.
+    """
+
+    COMPACT_IDLE_SECONDS = 0.5
+
+    def __init__(self, enrollment_system):
+        self.system = enrollment_system
+        # Changes are made durable by the grouped commit in _flush, not one fsync per request
+        self.system.autocommit = False
+        self.student_locks = KeyedLocks()
+        self.course_locks = KeyedLocks()
+        self._pending = []
+        self._flush_scheduled = False
+        self._active = 0  # Requests being handled
+        self._last_request = 0.0  # Loop time the last request arrived
+        self._compaction_scheduled = False
+
+    async def handle_client(self, reader, writer):
+        """Serve one connection until the client closes it"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._active += 1
+                self._last_request = asyncio.get_running_loop().time()
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("a request must be a JSON object")
+                    response = await self.dispatch(request)
+                except (TypeError, ValueError, AttributeError) as e:
+                    # Malformed fields (a standing that is not a number, a list for a name...)
+                    # fail this request only, not the whole connection
+                    response = {"ok": False, "message": f"Invalid request: {e}"}
+                except OSError as e:
+                    # The grouped commit could not write the journal
+                    response = {"ok": False, "message": "Change could not be saved", "error": str(e)}
+                finally:
+                    self._active -= 1
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+        """Route a request to its handler"""
+        op = request.get("op")
+        student_id = str(request.get("student_id", "")).upper()
+        course_id = str(request.get("course_id", ""))
+
+        if op == "enroll":
+            return await self.enroll(student_id, course_id)
+        if op == "drop":
+            return await self.drop(student_id, course_id)
+        if op == "join_waitlist":
+            standing = request.get("standing", 0)
+            if isinstance(standing, bool) or not isinstance(standing, int):
+                return {"ok": False, "message": "standing must be a whole number"}
+            return await self._change(self.system.join_waitlist, student_id, course_id, standing)
+        if op == "leave_waitlist":
+            return await self._change(self.system.leave_waitlist, student_id, course_id)
+        if op == "register":
+            return await self.register(request)
+        if op == "authenticate":
+            success, message = self.system.authenticate_student(student_id, request.get("password", ""))
+            return {"ok": success, "message": message}
+        if op == "schedule":
+            courses = self.system.get_student_courses(student_id)
+            return {"ok": True, "message": "", "courses": [course.course_id for course in courses]}
+        if op == "courses":
+            return {"ok": True, "message": "", "courses": [
+                {"course_id": course.course_id, "enrolled": course.enrolled_count, "max": course.max_students}
+                for course in self.system.get_available_courses()]}
+        if op == "search":
+            return self.search(request)
+        return {"ok": False, "message": f"Unknown operation: {op}"}
+
+    def search(self, request):
+        """Catalog query; filters match EnrollmentSystem.search_courses, times are 'HH:MM' strings"""
+        filters = {key: request[key] for key in ("department", "instructor", "day", "credits", "open_only",
+                                                 "page", "page_size") if key in request}
+        try:
+            for key in ("start_after", "end_before"):
+                if request.get(key):
+                    filters[key] = parse_time(request[key])
+            courses, total = self.system.search_courses(**filters)
+        except (TypeError, ValueError, AttributeError) as e:
+            return {"ok": False, "message": f"Invalid search: {e}"}
+        return {"ok": True, "message": "", "total": total, "courses": [
+            {"course_id": course.course_id, "name": course.name, "department": course.department,
+             "instructor": course.instructor, "days": course.days,
+             "start_time": course.start_time.strftime('%H:%M') if course.start_time else None,
+             "end_time": course.end_time.strftime('%H:%M') if course.end_time else None,
+             "credits": course.credits, "enrolled": course.enrolled_count, "max": course.max_students}
+            for course in courses]}
+
+    async def enroll(self, student_id, course_id):
+        return await self._change(self.system.enroll_student, student_id, course_id)
+
+    async def drop(self, student_id, course_id):
+        return await self._change(self.system.drop_course, student_id, course_id)
+
+    async def _change(self, change, student_id, course_id, *args):
+        """Apply change under the student and course locks, then wait for it to be durable"""
+        async with self.student_locks.hold(student_id):
+            async with self.course_locks.hold(course_id):
+                success, message = change(student_id, course_id, *args)
+        # Waiting outside the locks lets the next request for this seat join the same commit
+        if success:
+            await self._wait_for_commit()
+        return {"ok": success, "message": message}
+
+    async def register(self, request):
+        name = request.get("name")
+        password = request.get("password")
+        email = request.get("email", "")
+        major = request.get("major", "")
+        if not name or not password:
+            return {"ok": False, "message": "Name and password are required"}
+        if not all(isinstance(value, str) for value in (name, password, email, major)):
+            return {"ok": False, "message": "Name, password, email and major must be strings"}
+        if not email.endswith("@zed.edu"):
+            return {"ok": False, "message": "Email must end with '@zed.edu'"}
+
+        student_id = self.system.allocate_student_id()
+        if student_id is None:
+            return {"ok": False, "message": "No student IDs available"}
+        student = Student(student_id, name, password, email, major)
+        success, message = self.system.register_student(student)
+        if success:
+            # The new student is only a buffered journal record until the grouped commit runs
+            await self._wait_for_commit()
+        # register_student picks another ID if a process sharing the database took this one
+        return {"ok": success, "message": message, "student_id": student.student_id}
+
+    async def _wait_for_commit(self):
+        """Wait until the next grouped journal commit has made this change durable"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(future)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            # Runs after every request already queued on the loop has added its record
+            asyncio.get_running_loop().call_soon(self._flush)
+        await future
+
+    def _flush(self):
+        self._flush_scheduled = False
+        pending, self._pending = self._pending, []
+        try:
+            self.system.commit()
+        except OSError as e:
+            for future in pending:
+                future.set_exception(e)
+        else:
+            for future in pending:
+                future.set_result(None)
+            if self.system.compaction_due():
+                self._schedule_compaction()
+
+    def _schedule_compaction(self):
+        if not self._compaction_scheduled:
+            self._compaction_scheduled = True
+            asyncio.get_running_loop().call_later(self.COMPACT_IDLE_SECONDS, self._compact_when_idle)
+
+    def _compact_when_idle(self):
+        """Compact once no request has been in flight for COMPACT_IDLE_SECONDS, else look again later"""
+        self._compaction_scheduled = False
+        quiet = asyncio.get_running_loop().time() - self._last_request
+        if self._active or self._pending or quiet < self.COMPACT_IDLE_SECONDS:
+            self._schedule_compaction()
+            return
+        self.system.compact_if_due()
+
+
+async def serve(host, port, storage=None, metrics=None, log_events=False, shared=False):
+    enrollment_system = EnrollmentSystem(storage, metrics=metrics, log_events=log_events, shared=shared)
+    server = RegistrationServer(enrollment_system)
+    listener = await asyncio.start_server(server.handle_client, host, port, limit=1 << 20)
+    print(f"Registration server listening on {host}:{port}")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        enrollment_system.compact()
+        if metrics is not None:
+            metrics.flush()
+
+
+class LoadClient:
+    """One connection to the registration server"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        return cls(reader, writer)
+
+    async def call(self, **request):
+        self.writer.write((json.dumps(request) + "\n").encode())
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def run_load(host, port, students, clients, courses_per_student, hot_courses):
+    """Register simulated students, then have them all race to enroll in the same few courses"""
+    connections = [await LoadClient.connect(host, port) for _ in range(clients)]
+
+    print(f"Registering {students} simulated students...")
+    student_ids = []
+    for i in range(students):
+        response = await connections[i % clients].call(
+            op="register", name=f"Load Student {i}", password="load", email=f"load{i}@zed.edu", major="Load Testing")
+        if response["ok"]:
+            student_ids.append(response["student_id"])
+
+    catalog = (await connections[0].call(op="courses"))["courses"]
+    course_ids = [course["course_id"] for course in catalog]
+    if hot_courses:
+        course_ids = course_ids[:hot_courses]
+
+    queue = asyncio.Queue()
+    for student_id in student_ids:
+        for course_id in random.sample(course_ids, min(courses_per_student, len(course_ids))):
+            queue.put_nowait((student_id, course_id))
+
+    latencies = []
+    outcomes = defaultdict(int)
+
+    async def worker(connection):
+        while not queue.empty():
+            student_id, course_id = queue.get_nowait()
+            started = time.perf_counter()
+            response = await connection.call(op="enroll", student_id=student_id, course_id=course_id)
+            latencies.append(time.perf_counter() - started)
+            outcomes[response["message"] if not response["ok"] else "Enrollment successful"] += 1
+
+    print(f"Sending {queue.qsize()} enrollment requests over {clients} connections...")
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(connection) for connection in connections))
+    elapsed = time.perf_counter() - started
+
+    catalog = (await connections[0].call(op="courses"))["courses"]
+    overbooked = [course for course in catalog if course["enrolled"] > course["max"]]
+    for connection in connections:
+        await connection.close()
+
+    latencies.sort()
+    print("=" * 50)
+    print(f"Requests:   {len(latencies)}")
+    print(f"Elapsed:    {elapsed:.2f}s")
+    print(f"Throughput: {len(latencies) / elapsed:.0f} requests/s")
+    if latencies:
+        print(f"p50:        {latencies[len(latencies) // 2] * 1000:.2f} ms")
+        print(f"p99:        {latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000:.2f} ms")
+        print(f"max:        {latencies[-1] * 1000:.2f} ms")
+    for message, count in sorted(outcomes.items(), key=lambda item: -item[1]):
+        print(f"  {count:7d}  {message}")
+    print(f"Overbooked courses: {len(overbooked)}")
+    for course in overbooked:
+        print(f"  {course['course_id']}: {course['enrolled']}/{course['max']}")
+    return not overbooked
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Zed University concurrent registration service")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Run the registration server")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--storage", choices=["csv", "sqlite"], default="csv")
+    serve_parser.add_argument("--db", default=os.path.join("data", "registration.db"))
+    serve_parser.add_argument("--metrics", metavar="FILE", help="Prometheus text file for latency and I/O metrics")
+    serve_parser.add_argument("--metrics-interval", type=float, default=10.0)
+    serve_parser.add_argument("--events", action="store_true", help="Append change events to data/events.log")
+    serve_parser.add_argument("--shared", action="store_true",
+                              help="Share data/ with other processes (each request then commits under the lock)")
+
+    load_parser = subparsers.add_parser("load", help="Run the load generator against a server")
+    load_parser.add_argument("--host", default="127.0.0.1")
+    load_parser.add_argument("--port", type=int, default=8765)
+    load_parser.add_argument("--students", type=int, default=2000, help="Simulated students to register")
+    load_parser.add_argument("--clients", type=int, default=100, help="Concurrent connections")
+    load_parser.add_argument("--courses-per-student", type=int, default=3)
+    load_parser.add_argument("--hot-courses", type=int, default=3,
+                             help="Only race for the first N courses (0 for the whole catalog)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "serve":
+        storage = None
+        if args.storage == "sqlite":
+            os.makedirs(os.path.dirname(args.db) or ".", exist_ok=True)
+            storage = SQLiteStorage(args.db)
+        try:
+            metrics = Metrics(args.metrics, args.metrics_interval) if args.metrics else None
+            asyncio.run(serve(args.host, args.port, storage, metrics, args.events, args.shared))
+        except KeyboardInterrupt:
+            print("Server stopped.")
+    else:
+        ok = asyncio.run(run_load(args.host, args.port, args.students, args.clients,
+                                  args.courses_per_student, args.hot_courses))
+        raise SystemExit(0 if ok else 1)
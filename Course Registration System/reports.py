@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import time
+from collections import Counter, defaultdict
+
+from uni_registration import EnrollmentSystem
+
+
+class EnrollmentAggregates:
+    """Fill rates, department loads and instructor rosters kept current from change events.
+
+    Seed it once from a loaded EnrollmentSystem, then feed it events, either by subscribing
+    it to that system or by reading its event file. Every event costs O(1) to apply, so a
+    dashboard never has to rescan all the students again.
+    """
+
+    def __init__(self):
+        self.courses = {}  # course_id -> {"enrolled", "max", "credits", "department", "instructor"}
+        self.department_load = Counter()  # department -> enrollments
+        self.department_credits = Counter()  # department -> credits taken
+        self.instructor_rosters = defaultdict(Counter)  # instructor -> student_id -> courses taught to them
+        self.course_rosters = defaultdict(set)  # course_id -> student IDs, to move rosters between instructors
+        self.majors = Counter()
+        self.last_seq = 0
+
+    @classmethod
+    def from_system(cls, enrollment_system):
+        """Build the aggregates with one pass over the loaded data"""
+        aggregates = cls()
+        courses = enrollment_system.courses
+        for course in courses.values():
+            aggregates.courses[course.course_id] = {"enrolled": course.enrolled_count, "max": course.max_students,
+                                                    "credits": course.credits, "department": course.department,
+                                                    "instructor": course.instructor}
+            aggregates.department_load[course.department] += course.enrolled_count
+            aggregates.department_credits[course.department] += course.enrolled_count * course.credits
+        for student_id, student in enrollment_system.students.items():
+            aggregates.majors[student.major] += 1
+            for course_id in student.registered_courses:
+                if course_id in courses:
+                    aggregates.instructor_rosters[courses[course_id].instructor][student_id] += 1
+                    aggregates.course_rosters[course_id].add(student_id)
+        aggregates.last_seq = enrollment_system.last_event_seq
+        return aggregates
+
+    def __call__(self, event):
+        self.apply(event)
+
+    def apply(self, event):
+        """Update the aggregates for one change event"""
+        if event["seq"] <= self.last_seq:
+            return  # Already counted
+        self.last_seq = event["seq"]
+        event_type = event["type"]
+        if event_type in ("enroll", "drop"):
+            step = 1 if event_type == "enroll" else -1
+            course = self.courses.get(event["course_id"])
+            if course is not None:
+                course["enrolled"] += step
+                course["credits"] = event["credits"]
+            self.department_load[event["department"]] += step
+            self.department_credits[event["department"]] += step * event["credits"]
+            self._move(event["instructor"], event["student_id"], step)
+            if step > 0:
+                self.course_rosters[event["course_id"]].add(event["student_id"])
+            else:
+                self.course_rosters[event["course_id"]].discard(event["student_id"])
+        elif event_type == "register":
+            self.majors[event["major"]] += 1
+        elif event_type == "course_update":
+            course = self.courses.get(event["course_id"])
+            if course is None:
+                return
+            changes = event["changes"]
+            if "max_students" in changes:
+                course["max"] = changes["max_students"]
+            if "department" in changes:
+                self.department_load[course["department"]] -= course["enrolled"]
+                self.department_load[changes["department"]] += course["enrolled"]
+                credits = course["enrolled"] * course["credits"]
+                self.department_credits[course["department"]] -= credits
+                self.department_credits[changes["department"]] += credits
+                course["department"] = changes["department"]
+            if "instructor" in changes:
+                for student_id in self.course_rosters[event["course_id"]]:
+                    self._move(course["instructor"], student_id, -1)
+                    self._move(changes["instructor"], student_id, 1)
+                course["instructor"] = changes["instructor"]
+
+    def _move(self, instructor, student_id, step):
+        roster = self.instructor_rosters[instructor]
+        roster[student_id] += step
+        if roster[student_id] <= 0:
+            del roster[student_id]
+
+    def fill_rate(self, course_id):
+        course = self.courses[course_id]
+        return course["enrolled"] / course["max"] if course["max"] else 0.0
+
+    def fullest_courses(self, count=5):
+        return sorted(self.courses, key=self.fill_rate, reverse=True)[:count]
+
+    def render(self, count=5):
+        """Text dashboard of the current aggregates"""
+        lines = [f"Events applied through #{self.last_seq}", "Fullest courses:"]
+        for course_id in self.fullest_courses(count):
+            course = self.courses[course_id]
+            lines.append(f"  {course_id:10s} {course['enrolled']:5d}/{course['max']:<5d} "
+                         f"{self.fill_rate(course_id):6.1%}")
+        lines.append("Department load (enrollments, credits):")
+        for department, load in self.department_load.most_common(count):
+            lines.append(f"  {department:30s} {load:7d} {self.department_credits[department]:8d}")
+        lines.append("Largest instructor rosters:")
+        for instructor, roster in sorted(self.instructor_rosters.items(), key=lambda item: -len(item[1]))[:count]:
+            lines.append(f"  {instructor:30s} {len(roster):7d} students")
+        return "\n".join(lines)
+
+
+def follow_events(path, offset=0, poll_interval=1.0):
+    """Yield lists of the events appended to an event file from a byte offset on, one list per poll"""
+    while not os.path.exists(path):
+        time.sleep(poll_interval)
+    with open(path, 'r') as file:
+        file.seek(offset)
+        pending = ""  # A partially written last line waits here for the rest of it
+        while True:
+            events = []
+            for chunk in iter(file.readline, ""):
+                pending += chunk
+                if pending.endswith("\n"):
+                    try:
+                        events.append(json.loads(pending))
+                    except ValueError:
+                        pass
+                    pending = ""
+            if events:
+                yield events
+            else:
+                time.sleep(poll_interval)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Registration dashboard kept current from the change-event stream")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--top", type=int, default=5, help="Rows per section (default: 5)")
+    parser.add_argument("--follow", action="store_true",
+                        help="Keep applying events appended to events.log and redraw after each batch")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between checks for new events")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    enrollment_system = EnrollmentSystem(data_dir=args.data_dir, log_events=True)
+    aggregates = EnrollmentAggregates.from_system(enrollment_system)
+    print(aggregates.render(args.top))
+
+    if args.follow:
+        event_file = os.path.join(args.data_dir, enrollment_system.event_file)
+        offset = os.path.getsize(event_file) if os.path.exists(event_file) else 0
+        del enrollment_system  # Only the event file is read from here on
+        try:
+            for events in follow_events(event_file, offset, args.interval):
+                last_seq = aggregates.last_seq
+                for event in events:
+                    aggregates.apply(event)
+                if aggregates.last_seq != last_seq:
+                    print()
+                    print(aggregates.render(args.top))
+        except KeyboardInterrupt:
+            pass
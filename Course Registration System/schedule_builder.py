@@ -0,0 +1,184 @@
+import argparse
+import csv
+import time
+
+from uni_registration import EnrollmentSystem
+
+
+def _candidate_courses(enrollment_system, student, wishlist, required, objective):
+    """Courses the student could add on their own, with the value each is worth.
+
+    Returns (candidates, required_ids, budget), or None when a required course can never be taken.
+    """
+    courses = enrollment_system.courses
+    budget = enrollment_system.max_credits - student.get_total_credits(courses)
+    ranks = {}
+    for rank, course_id in enumerate(wishlist):
+        ranks.setdefault(course_id, rank)
+    required_ids = set()
+    for course_id in required:
+        if course_id not in student.registered_courses:
+            if course_id not in courses:
+                return None
+            required_ids.add(course_id)
+
+    candidates = []
+    for course_id in list(ranks) + sorted(required_ids - ranks.keys()):
+        course = courses.get(course_id)
+        if course is None:
+            continue
+        if (course_id in student.registered_courses or course.is_full() or course.credits > budget
+                or student.has_schedule_conflict(course, courses)):
+            if course_id in required_ids:
+                return None
+            continue
+        # Rank 1 of n is worth n, rank n is worth 1; required courses off the wishlist are worth nothing
+        if objective == "credits":
+            value = course.credits
+        else:
+            value = len(wishlist) - ranks[course_id] if course_id in ranks else 0
+        candidates.append((course, value))
+    return candidates, required_ids, budget
+
+
+def build_schedule(enrollment_system, student_id, wishlist, objective="preference", required=()):
+    """Find the best conflict-free set of wishlist courses a student can still add.
+
+    wishlist is a list of course IDs, most wanted first. objective is "preference"
+    (maximize rank weight) or "credits" (maximize credits). Only courses with open seats
+    that fit around the student's current schedule and credit limit are considered.
+    Every course in required must be in the schedule unless the student already has it.
+    Returns (course_ids, score), or (None, 0) when the required courses cannot all be taken.
+
+    Branch and bound over the candidates sorted by value per credit: each course is
+    either taken or skipped, conflicts are tracked as a bitmask over candidates, and a
+    branch is cut when even a fractional fill of the remaining credits cannot beat the
+    best schedule found so far.
+    """
+    student = enrollment_system.students.get(student_id.upper())
+    if student is None:
+        return [], 0
+
+    found = _candidate_courses(enrollment_system, student, wishlist, required, objective)
+    if found is None:
+        return None, 0
+    candidates, required_ids, budget = found
+    if not candidates:
+        return [], 0
+
+    # Best value per credit first so the greedy bound is tight and good schedules are found early
+    candidates.sort(key=lambda item: item[1] / item[0].credits if item[0].credits else float("inf"), reverse=True)
+    count = len(candidates)
+    credits = [course.credits for course, _ in candidates]
+    values = [value for _, value in candidates]
+
+    conflicts = [0] * count
+    for i in range(count):
+        for j in range(i + 1, count):
+            if candidates[i][0].has_time_conflict(candidates[j][0]):
+                conflicts[i] |= 1 << j
+                conflicts[j] |= 1 << i
+
+    must = 0
+    for i, (course, _) in enumerate(candidates):
+        if course.course_id in required_ids:
+            must |= 1 << i
+
+    best = [-1, 0]  # score, chosen bitmask; -1 until a schedule holding every required course is found
+
+    def bound(i, credits_left, blocked):
+        """Fractional-knapsack upper bound on the value still reachable from candidate i"""
+        total = 0
+        for j in range(i, count):
+            if blocked >> j & 1:
+                continue
+            if credits[j] <= credits_left:
+                credits_left -= credits[j]
+                total += values[j]
+            else:
+                if credits_left > 0:
+                    total += values[j] * credits_left / credits[j]
+                break
+        return total
+
+    def search(i, score, credits_left, chosen, blocked):
+        if score > best[0] and chosen & must == must:
+            best[0], best[1] = score, chosen
+        if i == count or score + bound(i, credits_left, blocked) <= best[0]:
+            return
+        if not blocked >> i & 1 and credits[i] <= credits_left:
+            search(i + 1, score + values[i], credits_left - credits[i], chosen | 1 << i, blocked | conflicts[i])
+        if not must >> i & 1:
+            search(i + 1, score, credits_left, chosen, blocked)
+
+    search(0, 0, budget, 0, 0)
+    if best[0] < 0:
+        return None, 0
+
+    chosen = [candidates[i][0].course_id for i in range(count) if best[1] >> i & 1]
+    # Report in wishlist order, required courses off the wishlist last
+    order = {course_id: rank for rank, course_id in reversed(list(enumerate(wishlist)))}
+    chosen.sort(key=lambda course_id: (order.get(course_id, len(wishlist)), course_id))
+    return chosen, best[0]
+
+
+def build_schedules(enrollment_system, wishlists, objective="preference", enroll=False):
+    """Build a schedule for every student in a {student_id: wishlist} mapping.
+
+    With enroll=True each schedule is enrolled before the next student is planned, so
+    later students only see the seats that are still open.
+    Returns {student_id: (course_ids, score)}.
+    """
+    results = {}
+    for student_id, wishlist in wishlists.items():
+        chosen, score = build_schedule(enrollment_system, student_id, wishlist, objective)
+        results[student_id] = (chosen, score)
+        if enroll and chosen:
+            enrollment_system.enroll_many([(student_id, course_id) for course_id in chosen])
+    return results
+
+
+def read_wishlists(path):
+    """Read StudentID,CourseID,Rank rows into {student_id: [course_id, ...]} ordered by rank"""
+    ranked = {}
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            student_id = row.get('student_id') or row.get('StudentID')
+            course_id = row.get('course_id') or row.get('CourseID')
+            rank = row.get('rank') or row.get('Rank')
+            if student_id and course_id:
+                entries = ranked.setdefault(student_id.strip().upper(), [])
+                entries.append((int(rank) if rank else len(entries) + 1, course_id.strip()))
+    return {student_id: [course_id for _, course_id in sorted(entries)] for student_id, entries in ranked.items()}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the best conflict-free schedule for each student's wishlist")
+    parser.add_argument("wishlists", help="CSV file with StudentID,CourseID,Rank columns (rank 1 = most wanted)")
+    parser.add_argument("--objective", choices=["preference", "credits"], default="preference")
+    parser.add_argument("--enroll", action="store_true", help="Enroll students in their schedules")
+    parser.add_argument("--output", metavar="CSV", help="Write StudentID,CourseID rows of the chosen schedules")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    enrollment_system = EnrollmentSystem()
+    wishlists = read_wishlists(args.wishlists)
+
+    started = time.perf_counter()
+    results = build_schedules(enrollment_system, wishlists, args.objective, args.enroll)
+    elapsed = time.perf_counter() - started
+
+    for student_id, (chosen, score) in results.items():
+        print(f"{student_id}: {', '.join(chosen) if chosen else '(nothing fits)'} [score {score}]")
+    print(f"Built {len(results)} schedules in {elapsed * 1000:.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(["StudentID", "CourseID"])
+            for student_id, (chosen, _) in results.items():
+                for course_id in chosen:
+                    writer.writerow([student_id, course_id])
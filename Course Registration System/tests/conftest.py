@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import generate_dataset  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A small registration dataset with no enrollments yet"""
+    path = str(tmp_path / "data")
+    generate_dataset(path, students=50, courses=40, departments=4, courses_per_student=0, meetings_per_day=20)
+    return path
@@ -0,0 +1,78 @@
+import itertools
+import os
+from datetime import time
+
+from uni_registration import EnrollmentSystem, SQLiteStorage
+
+
+def brute_force(courses, department=None, instructor=None, day=None, credits=None, open_only=False,
+                start_after=None, end_before=None):
+    """Every course matching the filters, found by checking each course in turn"""
+    matches = []
+    for course in courses.values():
+        if department is not None and course.department != department:
+            continue
+        if instructor is not None and course.instructor != instructor:
+            continue
+        if day is not None and day not in course.days:
+            continue
+        if credits is not None and course.credits != credits:
+            continue
+        if open_only and course.is_full():
+            continue
+        if (start_after is not None or end_before is not None) and course.start_time is None:
+            continue
+        if start_after is not None and course.start_time < start_after:
+            continue
+        if end_before is not None and (course.end_time is None or course.end_time > end_before):
+            continue
+        matches.append(course)
+    return sorted(matches, key=lambda course: course.course_id)
+
+
+def test_query_matches_brute_force(data_dir):
+    system = EnrollmentSystem(data_dir=data_dir)
+    students = iter(system.students)
+    # Fill a few courses so open_only has something to exclude
+    for course in list(system.courses.values())[::5]:
+        course.max_students = 1
+    system.get_catalog()
+    for course in list(system.courses.values())[::5]:
+        ok, message = system.enroll_student(next(students), course.course_id)
+        assert ok, message
+
+    sample = list(system.courses.values())[:4]
+    options = {
+        "department": [None, "Department 1", "No such department"],
+        "instructor": [None, sample[0].instructor],
+        "day": [None, "Mon", "Fri"],
+        "credits": [None, 2, 4],
+        "open_only": [False, True],
+        "start_after": [None, time(10, 0)],
+        "end_before": [None, time(13, 0)],
+    }
+    for values in itertools.product(*options.values()):
+        filters = dict(zip(options, values))
+        expected = brute_force(system.courses, **filters)
+        courses, total = system.search_courses(page_size=1000, **filters)
+        assert [course.course_id for course in courses] == [course.course_id for course in expected], filters
+        assert total == len(expected)
+
+    courses, total = system.search_courses(open_only=True, page=2, page_size=3)
+    expected = brute_force(system.courses, open_only=True)
+    assert [course.course_id for course in courses] == [course.course_id for course in expected[3:6]]
+    assert total == len(expected)
+
+
+def test_departments_show_seats_taken_elsewhere(data_dir):
+    path = os.path.join(data_dir, "registration.db")
+    EnrollmentSystem(SQLiteStorage(path), data_dir=data_dir)  # Seeds the database from the CSV files
+    viewer = EnrollmentSystem(SQLiteStorage(path), data_dir=data_dir, lazy=True)
+    other = EnrollmentSystem(SQLiteStorage(path), data_dir=data_dir, lazy=True)
+    course_id = next(iter(viewer.courses))
+    viewer.courses_by_department()  # Builds the catalog with the current counts
+    ok, message = other.enroll_student(next(iter(other.storage.student_ids())), course_id)
+    assert ok, message
+
+    listed = {course.course_id: course for courses in viewer.courses_by_department().values() for course in courses}
+    assert listed[course_id].enrolled_count == other.courses[course_id].enrolled_count == 1
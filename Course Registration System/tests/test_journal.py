@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+from uni_registration import EnrollmentSystem
+
+
+def enroll_any(system, student_id):
+    """Enroll the student in the first course that accepts them and return its ID"""
+    for course_id in system.courses:
+        ok, _ = system.enroll_student(student_id, course_id)
+        if ok:
+            return course_id
+    raise AssertionError(f"No course accepted {student_id}")
+
+
+def test_journal_replay_restores_enrollments(data_dir):
+    system = EnrollmentSystem(data_dir=data_dir)
+    student_id = next(iter(system.students))
+    course_id = enroll_any(system, student_id)
+    dropped = enroll_any(system, student_id)
+    system.drop_course(student_id, dropped)
+
+    restarted = EnrollmentSystem(data_dir=data_dir)
+    assert set(restarted.students[student_id].registered_courses) == {course_id}
+    assert restarted.courses[course_id].enrolled_count == 1
+    assert restarted.courses[dropped].enrolled_count == 0
+
+
+def test_commit_after_torn_write_survives_restart(data_dir):
+    system = EnrollmentSystem(data_dir=data_dir)
+    first, second, torn = list(system.students)[:3]
+    first_course = enroll_any(system, first)
+    del system
+
+    # A crash halfway through appending a record leaves a line with no newline
+    with open(f"{data_dir}/enrollments.journal", 'a') as file:
+        file.write(f"E,{torn},C00000")
+
+    system = EnrollmentSystem(data_dir=data_dir)
+    assert not system.students[torn].registered_courses
+    second_course = enroll_any(system, second)
+    del system
+
+    restarted = EnrollmentSystem(data_dir=data_dir)
+    assert set(restarted.students[first].registered_courses) == {first_course}
+    assert set(restarted.students[second].registered_courses) == {second_course}
+    assert not restarted.students[torn].registered_courses
+
+
+def test_commit_leaves_compaction_to_idle_time(data_dir):
+    system = EnrollmentSystem(data_dir=data_dir)
+    system.compact_threshold = 2
+    students = list(system.students)[:3]
+    enrolled = {student_id: enroll_any(system, student_id) for student_id in students}
+
+    # Past the threshold, but no request has paid for rewriting the CSVs
+    assert system.compaction_due()
+    assert os.path.getsize(f"{data_dir}/enrollments.journal") > 0
+    assert system.compact_if_due()
+    assert os.path.getsize(f"{data_dir}/enrollments.journal") == 0
+    assert not system.compact_if_due()
+
+    restarted = EnrollmentSystem(data_dir=data_dir)
+    for student_id, course_id in enrolled.items():
+        assert set(restarted.students[student_id].registered_courses) == {course_id}
+
+
+def test_commit_compacts_at_the_limit(data_dir):
+    system = EnrollmentSystem(data_dir=data_dir)
+    system.compact_limit = 2
+    first, second = list(system.students)[:2]
+    enroll_any(system, first)
+    assert os.path.getsize(f"{data_dir}/enrollments.journal") > 0
+    enroll_any(system, second)
+    assert os.path.getsize(f"{data_dir}/enrollments.journal") == 0
+
+
+def test_crash_during_compaction_keeps_the_journal(data_dir, monkeypatch):
+    system = EnrollmentSystem(data_dir=data_dir)
+    student_id = next(iter(system.students))
+    course_id = enroll_any(system, student_id)
+
+    def crash():
+        raise OSError("disk full")
+
+    # students.csv is replaced, then the crash hits before enrollments.csv is written
+    monkeypatch.setattr(system, "save_enrollments", crash)
+    with pytest.raises(OSError):
+        system.compact()
+    monkeypatch.undo()
+    assert os.path.getsize(f"{data_dir}/enrollments.journal") > 0
+    assert not [name for name in os.listdir(data_dir) if name.endswith(".tmp")]
+
+    restarted = EnrollmentSystem(data_dir=data_dir)
+    assert set(restarted.students[student_id].registered_courses) == {course_id}
+    assert restarted.courses[course_id].enrolled_count == 1
+
+
+def test_events_wait_for_commit(data_dir):
+    system = EnrollmentSystem(data_dir=data_dir)
+    system.autocommit = False
+    received = []
+    system.subscribe(received.append)
+    student_id = next(iter(system.students))
+    course_id = next(iter(system.courses))
+    ok, message = system.enroll_student(student_id, course_id)
+    assert ok, message
+    assert received == []
+    assert system.last_event_seq == 1
+
+    system.commit()
+    assert [(event["seq"], event["type"], event["course_id"]) for event in received] == [(1, "enroll", course_id)]
@@ -0,0 +1,107 @@
+import itertools
+import random
+from datetime import time
+
+from schedule_builder import build_schedule
+from uni_registration import Course, EnrollmentSystem, Student
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri"]
+
+
+def random_system(tmp_path, rng, count):
+    """An empty system filled with a small random catalog and one student holding a few courses"""
+    system = EnrollmentSystem(data_dir=str(tmp_path))
+    system.courses.clear()  # Drop the sample catalog an empty data directory starts with
+    for i in range(count):
+        start = rng.randrange(8 * 60, 16 * 60, 30)
+        course = Course(f"C{i:02d}", f"Course {i}", "Department", "Dr. Instructor", rng.choice([0, 30, 30, 30]),
+                        rng.randint(1, 4), rng.sample(DAYS, rng.randint(1, 2)),
+                        time(start // 60, start % 60), time((start + 75) // 60, (start + 75) % 60))
+        system.courses[course.course_id] = course
+    student = Student("Z00001", "Student", "password", "student@zed.edu", "Department")
+    for course in rng.sample(list(system.courses.values()), rng.randint(0, 2)):
+        if course.credits <= system.max_credits - student.get_total_credits(system.courses):
+            student.add_course(course)
+    system.students[student.student_id] = student
+    return system, student
+
+
+def brute_force(system, student, wishlist, objective, required):
+    """Best score over every subset of the wishlist and required courses, or None if none is feasible"""
+    courses = system.courses
+    budget = system.max_credits - student.get_total_credits(courses)
+    ranks = {}
+    for rank, course_id in enumerate(wishlist):
+        ranks.setdefault(course_id, rank)
+    must = {course_id for course_id in required if course_id not in student.registered_courses}
+    pool = [courses[course_id] for course_id in sorted(set(ranks) | must)]
+    best = None
+    for size in range(len(pool) + 1):
+        for subset in itertools.combinations(pool, size):
+            ids = {course.course_id for course in subset}
+            if not must <= ids or sum(course.credits for course in subset) > budget:
+                continue
+            if any(course.course_id in student.registered_courses or course.is_full()
+                   or student.has_schedule_conflict(course, courses) for course in subset):
+                continue
+            if any(a.has_time_conflict(b) for a, b in itertools.combinations(subset, 2)):
+                continue
+            if objective == "credits":
+                score = sum(course.credits for course in subset)
+            else:
+                score = sum(len(wishlist) - ranks[course.course_id] for course in subset if course.course_id in ranks)
+            best = score if best is None else max(best, score)
+    return best
+
+
+def check(system, student, wishlist, objective, required=()):
+    chosen, score = build_schedule(system, student.student_id, wishlist, objective, required)
+    expected = brute_force(system, student, wishlist, objective, required)
+    if expected is None:
+        assert chosen is None
+        return False
+    assert score == expected
+    # The schedule itself has to be feasible and worth the reported score
+    picked = [system.courses[course_id] for course_id in chosen]
+    assert set(required) - set(student.registered_courses) <= set(chosen)
+    assert sum(course.credits for course in picked) <= system.max_credits - student.get_total_credits(system.courses)
+    assert not any(a.has_time_conflict(b) for a, b in itertools.combinations(picked, 2))
+    assert not any(course.is_full() or student.has_schedule_conflict(course, system.courses) for course in picked)
+    return True
+
+
+def test_matches_brute_force(tmp_path):
+    rng = random.Random(0)
+    for n in range(40):
+        system, student = random_system(tmp_path / str(n), rng, rng.randint(4, 9))
+        course_ids = list(system.courses)
+        for _ in range(5):
+            wishlist = rng.sample(course_ids, rng.randint(0, len(course_ids)))
+            for objective in ("preference", "credits"):
+                check(system, student, wishlist, objective)
+
+
+def test_required_courses_match_brute_force(tmp_path):
+    rng = random.Random(1)
+    outcomes = set()
+    for n in range(60):
+        system, student = random_system(tmp_path / str(n), rng, rng.randint(4, 9))
+        course_ids = list(system.courses)
+        for _ in range(5):
+            wishlist = rng.sample(course_ids, rng.randint(0, len(course_ids)))
+            required = rng.sample(course_ids, rng.randint(1, 3))
+            for objective in ("preference", "credits"):
+                outcomes.add(check(system, student, wishlist, objective, required))
+    # Both feasible and infeasible required sets have to come up
+    assert outcomes == {True, False}
+
+
+def test_infeasible_required_courses(tmp_path):
+    system, student = random_system(tmp_path, random.Random(2), 0)
+    system.courses["A"] = Course("A", "A", "Department", "Dr. Instructor", 30, 3, ["Mon"], time(9, 0), time(10, 15))
+    system.courses["B"] = Course("B", "B", "Department", "Dr. Instructor", 30, 3, ["Mon"], time(10, 0), time(11, 15))
+    system.courses["FULL"] = Course("FULL", "Full", "Department", "Dr. Instructor", 0, 3)
+    assert build_schedule(system, student.student_id, ["A", "B"], "preference", ["A", "B"]) == (None, 0)
+    assert build_schedule(system, student.student_id, ["A"], "credits", ["FULL"]) == (None, 0)
+    assert build_schedule(system, student.student_id, ["A"], "credits", ["MISSING"]) == (None, 0)
+    assert build_schedule(system, student.student_id, ["A", "B"], "preference", ["B"]) == (["B"], 1)
@@ -0,0 +1,62 @@
+import asyncio
+
+from registration_server import LoadClient, RegistrationServer
+from uni_registration import EnrollmentSystem
+
+
+def run_with_server(server, scenario):
+    """Serve on a free port and run scenario(client) against it"""
+    async def main():
+        listener = await asyncio.start_server(server.handle_client, "127.0.0.1", 0)
+        client = await LoadClient.connect("127.0.0.1", listener.sockets[0].getsockname()[1])
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+            listener.close()
+            await listener.wait_closed()
+    return asyncio.run(main())
+
+
+def test_locks_are_released_before_the_commit(data_dir, monkeypatch):
+    system = EnrollmentSystem(data_dir=data_dir)
+    student_id = next(iter(system.students))
+    course_id = next(iter(system.courses))
+    server = RegistrationServer(system)
+    held = []
+    commit = system.commit
+
+    def recording_commit():
+        held.append((len(server.student_locks), len(server.course_locks)))
+        commit()
+
+    monkeypatch.setattr(system, "commit", recording_commit)
+
+    async def scenario(client):
+        return await client.call(op="enroll", student_id=student_id, course_id=course_id)
+
+    response = run_with_server(server, scenario)
+    assert response["ok"], response
+    assert held == [(0, 0)]
+
+
+def test_failed_commit_is_reported(data_dir, monkeypatch):
+    system = EnrollmentSystem(data_dir=data_dir)
+    student_id = next(iter(system.students))
+    course_id = next(iter(system.courses))
+
+    def failing_commit():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(system, "commit", failing_commit)
+
+    async def scenario(client):
+        failed = await client.call(op="enroll", student_id=student_id, course_id=course_id)
+        # The connection stays usable after the failure
+        courses = await client.call(op="courses")
+        return failed, courses
+
+    failed, courses = run_with_server(RegistrationServer(system), scenario)
+    assert failed["ok"] is False
+    assert "disk full" in failed["error"]
+    assert courses["ok"]
@@ -0,0 +1,55 @@
+import itertools
+import random
+from datetime import time
+
+from uni_registration import Course, Student
+
+
+def overlaps(a, b):
+    """The plain day-and-time comparison the slot masks stand in for"""
+    if not a.days or not b.days or a.start_time is None or b.start_time is None:
+        return False
+    return bool(set(a.days) & set(b.days)) and a.start_time <= b.end_time and a.end_time >= b.start_time
+
+
+def random_courses(count, seed=0):
+    rng = random.Random(seed)
+    courses = []
+    for i in range(count):
+        start = rng.randrange(8 * 60, 18 * 60, 5) + rng.choice([0, 1, 2])  # Some off the 5-minute grid
+        end = start + rng.choice([0, 4, 5, 50, 75, 90])
+        days = rng.sample(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat"], rng.randint(1, 3))
+        courses.append(Course(f"C{i:03d}", f"Course {i}", "Department", "Dr. Instructor", 30, 3, days,
+                              time(start // 60, start % 60), time(end // 60, end % 60)))
+    courses.append(Course("NOTIME", "Unscheduled", "Department", "Dr. Instructor", 30, 3))
+    return courses
+
+
+def test_pairwise_conflicts_match_brute_force():
+    courses = random_courses(120)
+    for a, b in itertools.combinations(courses, 2):
+        assert a.has_time_conflict(b) == overlaps(a, b), (a.course_id, b.course_id)
+        assert b.has_time_conflict(a) == overlaps(a, b), (b.course_id, a.course_id)
+
+
+def test_student_conflicts_match_brute_force():
+    courses = random_courses(120, seed=1)
+    by_id = {course.course_id: course for course in courses}
+    rng = random.Random(2)
+    for n in range(50):
+        student = Student(f"Z{n:05d}", "Student", "password", "student@zed.edu", "Department")
+        schedule = rng.sample(courses, rng.randint(0, 6))
+        for course in schedule:
+            student.add_course(course)
+        for course in rng.sample(courses, 20):
+            expected = [other.course_id for other in schedule if overlaps(course, other)]
+            found = [other.course_id for other in student.get_conflicting_courses(course, by_id)]
+            assert sorted(found) == sorted(expected)
+            assert student.has_schedule_conflict(course, by_id) == bool(expected)
+        # Dropping a course has to clear its slots unless another course still holds them
+        for course in schedule[:2]:
+            student.remove_course(course, by_id)
+            schedule.remove(course)
+        for course in rng.sample(courses, 20):
+            expected = any(overlaps(course, other) for other in schedule)
+            assert student.has_schedule_conflict(course, by_id) == expected
@@ -0,0 +1,34 @@
+import os
+
+from uni_registration import EnrollmentSystem, SQLiteStorage, Student
+
+
+def test_processes_sharing_a_database_get_distinct_ids(data_dir):
+    path = os.path.join(data_dir, "registration.db")
+    first = EnrollmentSystem(SQLiteStorage(path), data_dir=data_dir)
+    second = EnrollmentSystem(SQLiteStorage(path), data_dir=data_dir)
+    ids = set()
+    for n in range(40):
+        system = (first, second)[n % 2]
+        student = Student(system.allocate_student_id(), "Student", "password", "student@zed.edu", "Department")
+        ok, message = system.register_student(student)
+        assert ok, message
+        ids.add(student.student_id)
+    assert len(ids) == 40
+
+
+def test_taken_id_is_replaced_not_overwritten(data_dir):
+    path = os.path.join(data_dir, "registration.db")
+    first = EnrollmentSystem(SQLiteStorage(path), data_dir=data_dir)
+    second = EnrollmentSystem(SQLiteStorage(path), data_dir=data_dir)
+    student_id = first.allocate_student_id()
+    ok, message = first.register_student(Student(student_id, "First", "password", "first@zed.edu", "Department"))
+    assert ok, message
+
+    # second has not seen the new student, so its own check cannot catch the collision
+    late = Student(student_id, "Second", "password", "second@zed.edu", "Department")
+    ok, message = second.register_student(late)
+    assert ok, message
+    assert late.student_id != student_id
+    row = first.storage.conn.execute("SELECT name FROM students WHERE student_id = ?", (student_id,)).fetchone()
+    assert row == ("First",)
@@ -1,36 +1,358 @@
+import argparse
+import bisect
 import csv
+import hashlib
+import heapq
+import json
 import os
+import pickle
+import sqlite3
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, time
-import random
+from functools import lru_cache, wraps
+from time import monotonic, perf_counter
 
-def generate_unique_student_id(filename='data/students.csv'):
-        existing_ids = set()
-    
-        # Read existing IDs from the file
-        if os.path.exists(filename):
-            with open(filename, 'r') as file:
-                lines = file.readlines()
-                for line in lines[1:]:  # Skip header
-                    student_id = line.strip().split(',')[0]
-                    existing_ids.add(student_id)
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Weekly timetable grid used for schedule-conflict bitmasks
+DAY_INDEX = {"Mon": 0, "Tue": 1, "Wed": 2, "Thu": 3, "Fri": 4, "Sat": 5, "Sun": 6}
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# Binary snapshot header: magic, format version, header length
+SNAPSHOT_MAGIC = b"ZEDSNAP\0"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct("<8sHI")
+
+
+def trim_torn_tail(path):
+    """Cut an append-only file back to its last newline.
+
+    A crash mid-append can leave a partial last line. Replays skip it, but the next append
+    would be glued onto the fragment and lost with it, so writers call this first.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as file:
+        end = file.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            step = min(4096, position)
+            file.seek(position - step)
+            chunk = file.read(step)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                position = position - step + newline + 1
+                break
+            position -= step
+        if position != end:
+            file.truncate(position)
+            file.flush()
+            os.fsync(file.fileno())
+
+
+@contextmanager
+def atomic_write(path):
+    """Write a file under a temporary name, fsync it and rename it over path.
+
+    A crash leaves either the old file or the complete new one, never a half-written mix.
+    """
+    temp_file = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, 'w', newline='') as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, path)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+
+
+def fsync_directory(path):
+    """Make the renames done in a directory durable (skipped where directories cannot be opened)"""
+    try:
+        fd = os.open(path or ".", os.O_RDONLY)
+    except OSError:  # Windows
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class IdTable:
+    """Interns ID strings to dense integers so relationships can be stored as small int arrays"""
+
+    __slots__ = ('name', 'ids', 'index')
+
+    def __init__(self, name):
+        self.name = name
+        self.ids = []     # int -> ID string
+        self.index = {}   # ID string -> int
+
+    def intern(self, value):
+        """Get the integer for an ID, assigning the next one if it is new"""
+        number = self.index.get(value)
+        if number is None:
+            value = sys.intern(value)
+            number = len(self.ids)
+            self.ids.append(value)
+            self.index[value] = number
+        return number
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class IdTables:
+    """The course and student ID tables of one EnrollmentSystem.
+
+    Each system interns into its own tables, so a reload or a second system in the same
+    process starts from empty tables instead of growing a process-wide one forever.
+    """
+
+    __slots__ = ('courses', 'students')
+
+    def __init__(self):
+        self.courses = IdTable("course")
+        self.students = IdTable("student")
+
+
+# Tables for students and courses built outside a system; register_student moves them over
+DEFAULT_IDS = IdTables()
+_unpickling = threading.local()
+
+
+@contextmanager
+def _unpickling_into(ids):
+    """Intern the students and courses unpickled inside the block into ids"""
+    _unpickling.ids = ids
+    try:
+        yield
+    finally:
+        _unpickling.ids = None
+
+
+def _unpickle_ids():
+    return getattr(_unpickling, 'ids', None) or DEFAULT_IDS
+
+
+class IdSet:
+    """Read-only set of IDs stored as a sorted array of interned integers.
+
+    Behaves like the frozenset of ID strings it replaces (in, iteration, len) at a fraction of
+    the memory: 4 bytes per member and no per-member hash table. It is a view of a student's
+    or course's array, so changes go through add_course/remove_course and
+    add_student/remove_student, which keep the cached counters in step.
+    """
+
+    __slots__ = ('table', 'items')
+
+    def __init__(self, table, ids=(), items=None):
+        self.table = table
+        if items is None:
+            items = array('i', sorted({table.intern(value) for value in ids if value}))
+        self.items = items
+
+    def __contains__(self, value):
+        number = self.table.index.get(value)
+        if number is None:
+            return False
+        position = bisect.bisect_left(self.items, number)
+        return position < len(self.items) and self.items[position] == number
+
+    def __iter__(self):
+        ids = self.table.ids
+        return (ids[number] for number in self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return len(self.items) > 0
+
+    def __eq__(self, other):
+        return set(self) == set(other)
+
+    def __repr__(self):
+        return f"IdSet({sorted(self)!r})"
+
+    def __reduce__(self):
+        # Integers are only meaningful within one system's tables, so pickle the ID strings
+        return frozenset, (list(self),)
+
+
+def _insert_sorted(items, number):
+    """Insert a number into a sorted array; returns False if it was already there"""
+    position = bisect.bisect_left(items, number)
+    if position < len(items) and items[position] == number:
+        return False
+    items.insert(position, number)
+    return True
+
+
+def _remove_sorted(items, number):
+    """Remove a number from a sorted array; returns False if it was not there"""
+    position = bisect.bisect_left(items, number)
+    if position < len(items) and items[position] == number:
+        del items[position]
+        return True
+    return False
+
+
+@lru_cache(maxsize=None)
+def parse_time(value):
+    """Parse an 'HH:MM' string into a time object (course times repeat a lot, so results are cached)"""
+    if not value:
+        return None
+    h, m = map(int, value.split(':'))
+    return time(h, m)
+
+
+class StudentIdAllocator:
+    """Hands out unique Z##### student IDs in O(1) without scanning students.csv.
+
+    IDs follow a fixed permutation of 0-99999 (n -> n * ID_MULTIPLIER + ID_OFFSET mod 100000),
+    so they look random but each is visited exactly once; a persisted counter records how far
+    along the permutation we are. Counter values are reserved in blocks so the file is only
+    rewritten once every ID_BLOCK allocations. IDs already taken by existing students are skipped.
+
+    A process that exits leaves the rest of its block unused. Those IDs are not lost: once the
+    counter has gone through the whole permutation, allocate scans it again for IDs nobody took.
+
+    Blocks are reserved under a lock on the counter file itself, so processes that share no other
+    lock (several servers on one SQLite database) never reserve the same block.
+    """
+
+    ID_SPACE = 100000
+    ID_MULTIPLIER = 38461  # Coprime with ID_SPACE, so the mapping is a permutation
+    ID_OFFSET = 52711
+    ID_BLOCK = 64
+
+    def __init__(self, counter_file, is_taken):
+        self.counter_file = counter_file
+        self.is_taken = is_taken
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(counter_file + ".lock")
+        self._next = self._read_counter()
+        self._reserved_until = self._next
+        self._scan = 0  # Where the search for left-over IDs resumes once the counter is used up
+
+    def _read_counter(self):
+        try:
+            with open(self.counter_file, 'r') as file:
+                return int(file.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_counter(self, value):
+        temp_file = self.counter_file + ".tmp"
+        with open(temp_file, 'w') as file:
+            file.write(str(value))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, self.counter_file)
+
+    def allocate(self):
+        """Return an unused student ID, or None once all 100000 IDs are in use"""
+        with self._lock:
+            while self._next < self.ID_SPACE:
+                if self._next >= self._reserved_until:
+                    self._reserve_block()
+                    if self._next >= self.ID_SPACE:
+                        break
+                n = self._next
+                self._next += 1
+                new_id = self._id_at(n)
+                if not self.is_taken(new_id):
+                    return new_id
+            # Every counter value has been handed out, but IDs from blocks that were never used up
+            # may still be free; the cursor wraps once so IDs freed behind it are found too
+            for _ in range(self.ID_SPACE):
+                new_id = self._id_at(self._scan)
+                self._scan = (self._scan + 1) % self.ID_SPACE
+                if not self.is_taken(new_id):
+                    return new_id
+            return None
+
+    def _reserve_block(self):
+        self._file_lock.acquire()
+        try:
+            # Another process may have reserved blocks since; continue after them
+            self._next = max(self._next, self._read_counter())
+            if self._next < self.ID_SPACE:
+                self._reserved_until = min(self._next + self.ID_BLOCK, self.ID_SPACE)
+                self._write_counter(self._reserved_until)
+        finally:
+            self._file_lock.release()
+
+    def _id_at(self, n):
+        return f"Z{(n * self.ID_MULTIPLIER + self.ID_OFFSET) % self.ID_SPACE:05d}"
 
-        # Generate new ID until it's unique
-        while True:
-            new_id = f"Z{random.randint(0, 99999):05d}"
-            if new_id not in existing_ids:
-                return new_id
             
 class Student:
-    def __init__(self, student_id, name, password, email, major):
-        self.student_id = student_id
+    # Registered courses are kept as a sorted int array of interned course IDs;
+    # registered_courses wraps it in an IdSet view on access
+    __slots__ = ('student_id', 'name', 'password', 'email', 'major', 'ids',
+                 '_course_numbers', 'schedule_mask', 'total_credits')
+
+    def __init__(self, student_id, name, password, email, major, ids=None):
+        self.student_id = sys.intern(student_id)
         self.name = name
         self.password = password
         self.email = email
-        self.major = major
-        self.registered_courses = set()
+        self.major = sys.intern(major) if major else major  # Shared by many students
+        self.ids = ids or DEFAULT_IDS  # IdTables the course numbers belong to
+        self._course_numbers = array('i')
+        self.schedule_mask = 0  # OR of the slot masks of every registered course
+        self.total_credits = 0  # Kept in step with registered_courses by add_course/remove_course
     
+    @property
+    def registered_courses(self):
+        return IdSet(self.ids.courses, items=self._course_numbers)
+
+    def set_registered_courses(self, course_ids, courses):
+        """Replace the registered courses and recompute the cached totals from them"""
+        self._course_numbers = IdSet(self.ids.courses, course_ids).items
+        self.rebuild_totals(courses)
+
+    def rebind(self, ids):
+        """Move the student onto another system's ID tables"""
+        if ids is not self.ids:
+            course_ids = list(self.registered_courses)
+            self.ids = ids
+            self._course_numbers = IdSet(ids.courses, course_ids).items
+
+    def __getstate__(self):
+        # Interned numbers are per-process, so pickle the course ID strings
+        return (self.student_id, self.name, self.password, self.email, self.major,
+                list(self.registered_courses), self.schedule_mask, self.total_credits)
+
+    def __setstate__(self, state):
+        (self.student_id, self.name, self.password, self.email, self.major,
+         course_ids, self.schedule_mask, self.total_credits) = state
+        self.ids = _unpickle_ids()
+        self._course_numbers = IdSet(self.ids.courses, course_ids).items
+
     def get_total_credits(self, courses):
-        """Calculate total credits a student is enrolled in"""
+        """Get the total credits a student is enrolled in"""
+        return self.total_credits
+
+    def count_credits(self, courses):
+        """Calculate total credits from the registered courses"""
         total = 0
         for course_id in self.registered_courses:
             if course_id in courses:
@@ -39,11 +361,50 @@ class Student:
     
     def has_schedule_conflict(self, new_course, courses):
         """Check if a new course conflicts with existing schedule"""
+        # No shared timetable slot means no conflict, without looking at any course
+        if not self.schedule_mask & new_course.slot_mask:
+            return False
+        return bool(self.get_conflicting_courses(new_course, courses))
+
+    def get_conflicting_courses(self, new_course, courses):
+        """List the registered courses that clash with a new course"""
+        conflicts = []
+        if not self.schedule_mask & new_course.slot_mask:
+            return conflicts
         for enrolled_course_id in self.registered_courses:
             enrolled_course = courses.get(enrolled_course_id)
             if enrolled_course and new_course.has_time_conflict(enrolled_course):
-                return True
-        return False
+                conflicts.append(enrolled_course)
+        return conflicts
+
+    def add_course(self, course):
+        """Add a course to the student's schedule"""
+        if not _insert_sorted(self._course_numbers, course.number):
+            return
+        self.schedule_mask |= course.slot_mask
+        self.total_credits += course.credits
+
+    def remove_course(self, course, courses):
+        """Remove a course from the student's schedule"""
+        if not _remove_sorted(self._course_numbers, course.number):
+            return
+        self.total_credits -= course.credits
+        # Courses may share slots if the data was loaded with overlaps, so rebuild rather than clear bits
+        self.rebuild_schedule_mask(courses)
+
+    def rebuild_schedule_mask(self, courses):
+        """Recompute the schedule mask from the registered courses"""
+        mask = 0
+        for course_id in self.registered_courses:
+            course = courses.get(course_id)
+            if course:
+                mask |= course.slot_mask
+        self.schedule_mask = mask
+
+    def rebuild_totals(self, courses):
+        """Recompute the cached schedule mask and credit total from the registered courses"""
+        self.rebuild_schedule_mask(courses)
+        self.total_credits = self.count_credits(courses)
     
     def to_csv_row(self):
         """Convert student data to a CSV row"""
@@ -51,24 +412,104 @@ class Student:
 
 
 class Course:
-    def __init__(self, course_id, name, department, instructor, max_students=5, credits=2, days=None, start_time=None, end_time=None):
-        self.course_id = course_id
+    # The roster is kept as a sorted int array of interned student IDs;
+    # enrolled_students wraps it in an IdSet view on access
+    __slots__ = ('course_id', 'ids', 'number', 'name', 'department', 'instructor', '_student_numbers',
+                 'enrolled_count', 'max_students', 'credits', 'days', 'start_time', 'end_time', 'slot_mask')
+
+    def __init__(self, course_id, name, department, instructor, max_students=5, credits=2, days=None, start_time=None,
+                 end_time=None, ids=None):
+        self.course_id = sys.intern(course_id)
+        self.ids = ids or DEFAULT_IDS  # IdTables the course and roster numbers belong to
+        self.number = self.ids.courses.intern(course_id)
         self.name = name
-        self.department = department
-        self.instructor = instructor
-        self.enrolled_students = set()
+        self.department = sys.intern(department) if department else department
+        self.instructor = sys.intern(instructor) if instructor else instructor
+        self._student_numbers = array('i')
+        self.enrolled_count = 0  # Kept in step with enrolled_students by add_student/remove_student
         self.max_students = max_students
         self.credits = credits
-        self.days = days or []  # List of days (e.g., ['Mon', 'Wed'])
+        self.days = [sys.intern(day) for day in days] if days else []  # List of days (e.g., ['Mon', 'Wed'])
         self.start_time = start_time  # datetime.time object
         self.end_time = end_time      # datetime.time object
+        self.slot_mask = self._compute_slot_mask()
+
+    def _compute_slot_mask(self):
+        """Weekly occupancy bitmask: one bit per SLOT_MINUTES slot, SLOTS_PER_DAY bits per day"""
+        if not self.days or self.start_time is None or self.end_time is None:
+            return 0
+        first = (self.start_time.hour * 60 + self.start_time.minute) // SLOT_MINUTES
+        # End time is inclusive, matching the <=/>= comparison in has_time_conflict
+        last = (self.end_time.hour * 60 + self.end_time.minute) // SLOT_MINUTES
+        if last < first:
+            return 0
+        day_span = ((1 << (last - first + 1)) - 1) << first
+        mask = 0
+        for day in self.days:
+            if day not in DAY_INDEX:
+                # Unknown day name: fall back to the exact comparison for this course
+                return -1
+            mask |= day_span << (DAY_INDEX[day] * SLOTS_PER_DAY)
+        return mask
+
+    def slots(self):
+        """Yield the index of every slot this course occupies"""
+        mask = self.slot_mask
+        if mask < 0:
+            return
+        while mask:
+            low_bit = mask & -mask
+            yield low_bit.bit_length() - 1
+            mask ^= low_bit
     
+    @property
+    def enrolled_students(self):
+        return IdSet(self.ids.students, items=self._student_numbers)
+
+    def set_enrolled_students(self, student_ids):
+        """Replace the roster and recount enrolled_count from it"""
+        self._student_numbers = IdSet(self.ids.students, student_ids).items
+        self.enrolled_count = len(self._student_numbers)
+
+    def __getstate__(self):
+        # Interned numbers are per-process, so pickle the student ID strings
+        return (self.course_id, self.name, self.department, self.instructor, list(self.enrolled_students),
+                self.enrolled_count, self.max_students, self.credits, self.days, self.start_time,
+                self.end_time, self.slot_mask)
+
+    def __setstate__(self, state):
+        (self.course_id, self.name, self.department, self.instructor, student_ids,
+         self.enrolled_count, self.max_students, self.credits, self.days, self.start_time,
+         self.end_time, self.slot_mask) = state
+        self.ids = _unpickle_ids()
+        self.number = self.ids.courses.intern(self.course_id)
+        self._student_numbers = IdSet(self.ids.students, student_ids).items
+
     def is_full(self):
         """Check if course has reached maximum capacity"""
-        return len(self.enrolled_students) >= self.max_students
+        return self.enrolled_count >= self.max_students
+
+    def seats_left(self):
+        """Number of open seats in the course"""
+        return max(self.max_students - self.enrolled_count, 0)
+
+    def add_student(self, student_id):
+        """Add a student to the course roster"""
+        if _insert_sorted(self._student_numbers, self.ids.students.intern(student_id)):
+            self.enrolled_count += 1
+
+    def remove_student(self, student_id):
+        """Remove a student from the course roster"""
+        number = self.ids.students.index.get(student_id)
+        if number is not None and _remove_sorted(self._student_numbers, number):
+            self.enrolled_count -= 1
     
     def has_time_conflict(self, other_course):
         """Check if this course has a time conflict with another course"""
+        # Disjoint slot masks can never overlap
+        if not self.slot_mask & other_course.slot_mask:
+            return False
+
         # Check if any days overlap
         days_overlap = any(day in other_course.days for day in self.days)
         if not days_overlap:
@@ -97,27 +538,763 @@ class Course:
             ",".join(self.enrolled_students)
         ]
     
-    def __str__(self):
-        """String representation of the course for display"""
+    def schedule_str(self):
+        """Meeting days and times for display, e.g. 'Mon, Wed 09:00 - 10:30'"""
         days_str = ", ".join(self.days)
         time_str = f"{self.start_time.strftime('%H:%M')} - {self.end_time.strftime('%H:%M')}" if self.start_time and self.end_time else "N/A"
+        return f"{days_str} {time_str}"
+    
+    def __str__(self):
+        """String representation of the course for display"""
         return f"{self.course_id}: {self.name} ({self.department})\n" \
                f"  Instructor: {self.instructor}\n" \
-               f"  Schedule: {days_str} {time_str}\n" \
+               f"  Schedule: {self.schedule_str()}\n" \
                f"  Credits: {self.credits}\n" \
-               f"  Enrollment: {len(self.enrolled_students)}/{self.max_students}"
+               f"  Enrollment: {self.enrolled_count}/{self.max_students}"
+
+
+class Waitlist:
+    """Priority waitlist for one course: higher class standing first, then earliest request"""
+
+    def __init__(self, course_id):
+        self.course_id = course_id
+        self._heap = []
+        self._entries = {}  # student_id -> heap entry; leaving blanks the entry instead of re-heapifying
+        self._sequence = 0
+
+    def join(self, student_id, standing=0, requested_at=None):
+        """Add a student to the waitlist"""
+        if student_id in self._entries:
+            return False
+        requested_at = requested_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        entry = [-standing, requested_at, self._sequence, student_id]
+        self._sequence += 1
+        heapq.heappush(self._heap, entry)
+        self._entries[student_id] = entry
+        return True
+
+    def leave(self, student_id):
+        """Remove a student from the waitlist"""
+        entry = self._entries.pop(student_id, None)
+        if entry is None:
+            return False
+        entry[-1] = None
+        # Drop blanked entries once they make up most of the heap
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [entry for entry in self._heap if entry[-1] is not None]
+            heapq.heapify(self._heap)
+        return True
+
+    def pop(self):
+        """Remove and return the highest-priority student, or None if the waitlist is empty"""
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            student_id = entry[-1]
+            if student_id is not None:
+                del self._entries[student_id]
+                return student_id
+        return None
+
+    def position(self, student_id):
+        """1-based position of a student in the waitlist, or None"""
+        entry = self._entries.get(student_id)
+        if entry is None:
+            return None
+        return 1 + sum(1 for other in self._entries.values() if other < entry)
+
+    def to_rows(self):
+        """Waitlist entries in priority order as [student_id, standing, requested_at] rows"""
+        return [[entry[3], -entry[0], entry[1]] for entry in sorted(self._entries.values())]
+
+    def __contains__(self, student_id):
+        return student_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteStorage:
+    """SQLite backend for EnrollmentSystem with indexed tables and transactional enrollment"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS students (
+            student_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            password TEXT NOT NULL,
+            email TEXT,
+            major TEXT
+        );
+        CREATE TABLE IF NOT EXISTS courses (
+            course_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            department TEXT,
+            instructor TEXT,
+            max_students INTEGER NOT NULL,
+            credits INTEGER NOT NULL,
+            days TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            enrolled INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS course_days (
+            course_id TEXT NOT NULL REFERENCES courses(course_id),
+            day TEXT NOT NULL,
+            PRIMARY KEY (course_id, day)
+        );
+        CREATE TABLE IF NOT EXISTS enrollments (
+            student_id TEXT NOT NULL REFERENCES students(student_id),
+            course_id TEXT NOT NULL REFERENCES courses(course_id),
+            enrollment_date TEXT,
+            PRIMARY KEY (student_id, course_id)
+        );
+        CREATE TABLE IF NOT EXISTS waitlists (
+            course_id TEXT NOT NULL REFERENCES courses(course_id),
+            student_id TEXT NOT NULL REFERENCES students(student_id),
+            standing INTEGER NOT NULL DEFAULT 0,
+            requested_at TEXT NOT NULL,
+            PRIMARY KEY (course_id, student_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_enrollments_student ON enrollments(student_id);
+        CREATE INDEX IF NOT EXISTS idx_enrollments_course ON enrollments(course_id);
+        CREATE INDEX IF NOT EXISTS idx_courses_department ON courses(department);
+        CREATE INDEX IF NOT EXISTS idx_course_days_day ON course_days(day, course_id);
+    """
+
+    def __init__(self, path=os.path.join("data", "registration.db")):
+        self.path = path
+        # Autocommit mode so transactions are controlled explicitly with BEGIN/COMMIT
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add the seat-count aggregate to databases created before it existed"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(courses)")}
+        if "enrolled" not in columns:
+            with self.transaction():
+                self.conn.execute("ALTER TABLE courses ADD COLUMN enrolled INTEGER NOT NULL DEFAULT 0")
+                self._recount_enrollments()
+
+    def _recount_enrollments(self):
+        self.conn.execute("UPDATE courses SET enrolled = "
+                          "(SELECT COUNT(*) FROM enrollments e WHERE e.course_id = courses.course_id)")
+
+    def is_empty(self):
+        """Check whether the database has no courses yet"""
+        return self.conn.execute("SELECT 1 FROM courses LIMIT 1").fetchone() is None
+
+    def load(self, system):
+        """Load students, courses and enrollments into the system's dictionaries"""
+        for row in self.conn.execute("SELECT student_id, name, password, email, major FROM students"):
+            system.students[row[0]] = Student(*row, ids=system.ids)
+
+        self._load_courses(system)
+
+        for student_id, course_id in self.conn.execute("SELECT student_id, course_id FROM enrollments"):
+            if student_id in system.students and course_id in system.courses:
+                system._link(system.students[student_id], system.courses[course_id])
+
+        self._load_waitlists(system)
+
+    def load_catalog(self, system):
+        """Load only the courses, with seat counts from the enrolled aggregate, and the waitlists"""
+        for course, enrolled in self._load_courses(system):
+            course.enrolled_count = enrolled
+        self._load_waitlists(system)
+
+    def _load_courses(self, system):
+        loaded = []
+        for row in self.conn.execute("SELECT course_id, name, department, instructor, max_students, "
+                                     "credits, days, start_time, end_time, enrolled FROM courses"):
+            course_id, name, department, instructor, max_students, credits, days, start, end, enrolled = row
+            course = Course(course_id, name, department, instructor, max_students, credits,
+                            days.split(',') if days else [], parse_time(start), parse_time(end), system.ids)
+            system.courses[course_id] = course
+            loaded.append((course, enrolled))
+        return loaded
+
+    def _load_waitlists(self, system):
+        for course_id, student_id, standing, requested_at in self.conn.execute(
+                "SELECT course_id, student_id, standing, requested_at FROM waitlists ORDER BY rowid"):
+            if course_id in system.courses:
+                system.get_waitlist(course_id).join(student_id, standing, requested_at)
+
+    def get_student(self, student_id, courses, ids=None):
+        """Fetch one student and their registered courses through the primary key and enrollment index"""
+        row = self.conn.execute("SELECT student_id, name, password, email, major FROM students WHERE student_id = ?",
+                                (student_id,)).fetchone()
+        if row is None:
+            return None
+        student = Student(*row, ids=ids)
+        student.set_registered_courses([course_id for (course_id,) in self.conn.execute(
+            "SELECT course_id FROM enrollments WHERE student_id = ?", (student_id,))], courses)
+        return student
+
+    def student_ids(self):
+        return [student_id for (student_id,) in self.conn.execute("SELECT student_id FROM students")]
+
+    def count_students(self):
+        return self.conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    def seat_counts(self, course_id=None):
+        """The enrolled aggregate per course (or for one course), as other connections have left it"""
+        if course_id is not None:
+            return dict(self.conn.execute("SELECT course_id, enrolled FROM courses WHERE course_id = ?", (course_id,)))
+        return dict(self.conn.execute("SELECT course_id, enrolled FROM courses"))
+
+    def count_enrollments(self, course_id=None):
+        """Actual enrollments per course (or for one course), for checking the enrolled aggregate"""
+        if course_id is not None:
+            return dict(self.conn.execute("SELECT course_id, COUNT(*) FROM enrollments WHERE course_id = ?",
+                                          (course_id,)))
+        return dict(self.conn.execute("SELECT course_id, COUNT(*) FROM enrollments GROUP BY course_id"))
+
+    def import_from(self, system):
+        """Copy every student, course and enrollment held by the system into the database"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self.transaction():
+            for student in system.students.values():
+                self._insert_student(student)
+            for course in system.courses.values():
+                self._insert_course(course)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO enrollments (student_id, course_id, enrollment_date) VALUES (?, ?, ?)",
+                ((student_id, course_id, today)
+                 for student_id, student in system.students.items()
+                 for course_id in student.registered_courses if course_id in system.courses))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO waitlists (course_id, student_id, standing, requested_at) VALUES (?, ?, ?, ?)",
+                ((course_id, student_id, standing, requested_at)
+                 for course_id, waitlist in system.waitlists.items()
+                 for student_id, standing, requested_at in waitlist.to_rows()))
+            self._recount_enrollments()
+
+    def add_student(self, student):
+        """Insert a newly registered student; raises sqlite3.IntegrityError if the ID is taken"""
+        with self.transaction():
+            self.conn.execute("INSERT INTO students (student_id, name, password, email, major) VALUES (?, ?, ?, ?, ?)",
+                              (student.student_id, student.name, student.password, student.email, student.major))
+
+    def enroll(self, student_id, course_id, max_credits):
+        """Enroll a student, checking capacity, conflicts and credits in one transaction"""
+        with self.transaction():
+            course = self.conn.execute(
+                "SELECT max_students, credits, start_time, end_time, enrolled FROM courses WHERE course_id = ?",
+                (course_id,)).fetchone()
+            if course is None:
+                return False, "Course not found"
+            max_students, credits, start_time, end_time, enrolled = course
+
+            if self.conn.execute("SELECT 1 FROM enrollments WHERE student_id = ? AND course_id = ?",
+                                 (student_id, course_id)).fetchone():
+                return False, "Already enrolled in this course"
+
+            if enrolled >= max_students:
+                return False, "Course is full"
+
+            # Same rule as Course.has_time_conflict: a shared day and overlapping times
+            conflict = self.conn.execute("""
+                SELECT 1 FROM enrollments e
+                JOIN courses c ON c.course_id = e.course_id
+                JOIN course_days d ON d.course_id = c.course_id
+                JOIN course_days nd ON nd.day = d.day AND nd.course_id = ?
+                WHERE e.student_id = ? AND c.start_time <= ? AND c.end_time >= ?
+                LIMIT 1""", (course_id, student_id, end_time, start_time)).fetchone()
+            if conflict:
+                return False, "Schedule conflict with existing course"
+
+            current_credits = self.conn.execute("""
+                SELECT COALESCE(SUM(c.credits), 0) FROM enrollments e
+                JOIN courses c ON c.course_id = e.course_id
+                WHERE e.student_id = ?""", (student_id,)).fetchone()[0]
+            new_total_credits = current_credits + credits
+            if new_total_credits > max_credits:
+                return False, f"Credit limit exceeded. Maximum: {max_credits}, Attempted: {new_total_credits}"
+
+            self.conn.execute("INSERT INTO enrollments (student_id, course_id, enrollment_date) VALUES (?, ?, ?)",
+                              (student_id, course_id, datetime.now().strftime("%Y-%m-%d")))
+            self.conn.execute("UPDATE courses SET enrolled = enrolled + 1 WHERE course_id = ?", (course_id,))
+        return True, "Enrollment successful"
+
+    def drop(self, student_id, course_id):
+        """Remove an enrollment"""
+        with self.transaction():
+            cursor = self.conn.execute("DELETE FROM enrollments WHERE student_id = ? AND course_id = ?",
+                                       (student_id, course_id))
+            if cursor.rowcount:
+                self.conn.execute("UPDATE courses SET enrolled = enrolled - 1 WHERE course_id = ?", (course_id,))
+        if cursor.rowcount == 0:
+            return False, "Not enrolled in this course"
+        return True, "Course dropped successfully"
+
+    def update_course(self, course):
+        """Write a course's descriptive fields and capacity, leaving the enrolled aggregate alone"""
+        with self.transaction():
+            self.conn.execute("UPDATE courses SET name = ?, department = ?, instructor = ?, max_students = ? "
+                              "WHERE course_id = ?",
+                              (course.name, course.department, course.instructor, course.max_students,
+                               course.course_id))
+
+    def add_to_waitlist(self, course_id, student_id, standing, requested_at):
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR IGNORE INTO waitlists (course_id, student_id, standing, requested_at) VALUES (?, ?, ?, ?)",
+                (course_id, student_id, standing, requested_at))
+
+    def remove_from_waitlist(self, course_id, student_id):
+        with self.transaction():
+            self.conn.execute("DELETE FROM waitlists WHERE course_id = ? AND student_id = ?", (course_id, student_id))
+
+    def transaction(self):
+        """Context manager wrapping a write transaction"""
+        return _SQLiteTransaction(self.conn)
+
+    def close(self):
+        self.conn.close()
+
+    def _insert_student(self, student):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO students (student_id, name, password, email, major) VALUES (?, ?, ?, ?, ?)",
+            (student.student_id, student.name, student.password, student.email, student.major))
+
+    def _insert_course(self, course):
+        start_time_str = course.start_time.strftime('%H:%M') if course.start_time else None
+        end_time_str = course.end_time.strftime('%H:%M') if course.end_time else None
+        self.conn.execute(
+            "INSERT OR REPLACE INTO courses (course_id, name, department, instructor, max_students, credits, "
+            "days, start_time, end_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (course.course_id, course.name, course.department, course.instructor, course.max_students,
+             course.credits, ",".join(course.days), start_time_str, end_time_str))
+        self.conn.execute("DELETE FROM course_days WHERE course_id = ?", (course.course_id,))
+        self.conn.executemany("INSERT OR IGNORE INTO course_days (course_id, day) VALUES (?, ?)",
+                              ((course.course_id, day) for day in course.days))
+
+
+class _SQLiteTransaction:
+    """BEGIN IMMEDIATE ... COMMIT, or a savepoint when already inside a transaction"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.nested = False
+
+    def __enter__(self):
+        self.nested = self.conn.in_transaction
+        if self.nested:
+            self.conn.execute("SAVEPOINT nested")
+        else:
+            self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.nested:
+            if exc_type:
+                self.conn.execute("ROLLBACK TO nested")
+            self.conn.execute("RELEASE nested")
+        elif exc_type:
+            self.conn.execute("ROLLBACK")
+        else:
+            self.conn.execute("COMMIT")
+        return False
+
+
+class StudentCache:
+    """Dictionary-like view of the students table that fetches records on demand.
+
+    Up to capacity students are kept in least-recently-used order; a miss costs one indexed
+    lookup for the student and one for their enrollments. The database stays authoritative,
+    since every enroll/drop is written through, so evicting a student never loses anything.
+    """
+
+    def __init__(self, storage, courses, capacity=1024, ids=None):
+        self.storage = storage
+        self.courses = courses
+        self.capacity = capacity
+        self.ids = ids
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, student_id, default=None):
+        student = self._cache.get(student_id)
+        if student is not None:
+            self._cache.move_to_end(student_id)
+            self.hits += 1
+            return student
+        self.misses += 1
+        student = self.storage.get_student(student_id, self.courses, self.ids)
+        if student is None:
+            return default
+        self[student_id] = student
+        return student
+
+    def __getitem__(self, student_id):
+        student = self.get(student_id)
+        if student is None:
+            raise KeyError(student_id)
+        return student
+
+    def __contains__(self, student_id):
+        return self.get(student_id) is not None
+
+    def __setitem__(self, student_id, student):
+        self._cache[student_id] = student
+        self._cache.move_to_end(student_id)
+        if len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+    def __len__(self):
+        return self.storage.count_students()
+
+    def __iter__(self):
+        return iter(self.storage.student_ids())
+
+    def keys(self):
+        return self.storage.student_ids()
+
+    def values(self):
+        """Every student, fetched one at a time without filling the cache"""
+        for student_id in self.storage.student_ids():
+            student = self._cache.get(student_id)
+            if student is None:
+                student = self.storage.get_student(student_id, self.courses, self.ids)
+            yield student
+
+    def items(self):
+        for student in self.values():
+            yield student.student_id, student
+
+    def cached(self):
+        """Students currently held in memory"""
+        return list(self._cache.values())
+
+
+class CourseCatalog:
+    """Secondary indexes over the course catalog for filtered, sorted, paginated queries.
+
+    Every index maps a value to a sorted list of course IDs, so a query starts from the
+    smallest matching list and checks the remaining filters only on those courses. The
+    open-seat index is updated by EnrollmentSystem whenever an enrollment changes.
+    """
+
+    def __init__(self, courses):
+        self.courses = courses
+        self.all_ids = []
+        self.by_department = {}
+        self.by_instructor = {}
+        self.by_day = {}
+        self.by_credits = {}
+        self.open_ids = []
+        self.by_start = []  # Sorted (start minute, course_id) pairs for time-window queries
+        for course in courses.values():
+            self.add_course(course)
+
+    @staticmethod
+    def _minutes(value):
+        return value.hour * 60 + value.minute
+
+    def add_course(self, course):
+        """Index a course (or re-index it after its details changed)"""
+        self.remove_course(course.course_id)
+        course_id = course.course_id
+        bisect.insort(self.all_ids, course_id)
+        bisect.insort(self.by_department.setdefault(course.department, []), course_id)
+        bisect.insort(self.by_instructor.setdefault(course.instructor, []), course_id)
+        bisect.insort(self.by_credits.setdefault(course.credits, []), course_id)
+        for day in course.days:
+            bisect.insort(self.by_day.setdefault(day, []), course_id)
+        if course.start_time is not None:
+            bisect.insort(self.by_start, (self._minutes(course.start_time), course_id))
+        if not course.is_full():
+            bisect.insort(self.open_ids, course_id)
+
+    def remove_course(self, course_id):
+        """Drop a course from every index"""
+        if not self._discard(self.all_ids, course_id):
+            return
+        for index in (self.by_department, self.by_instructor, self.by_day, self.by_credits):
+            for ids in index.values():
+                self._discard(ids, course_id)
+        self._discard(self.open_ids, course_id)
+        self.by_start = [entry for entry in self.by_start if entry[1] != course_id]
+
+    def update_seats(self, course):
+        """Keep the open-seat index in step after an enroll or drop"""
+        if course.is_full():
+            self._discard(self.open_ids, course.course_id)
+        else:
+            position = bisect.bisect_left(self.open_ids, course.course_id)
+            if position == len(self.open_ids) or self.open_ids[position] != course.course_id:
+                self.open_ids.insert(position, course.course_id)
+
+    @staticmethod
+    def _discard(ids, course_id):
+        position = bisect.bisect_left(ids, course_id)
+        if position < len(ids) and ids[position] == course_id:
+            del ids[position]
+            return True
+        return False
+
+    def query(self, department=None, instructor=None, day=None, credits=None, open_only=False,
+              start_after=None, end_before=None, page=1, page_size=20):
+        """Find courses matching every given filter, sorted by course ID.
+
+        start_after/end_before are datetime.time bounds on the meeting time. Returns
+        (courses on the requested page, total number of matches).
+        """
+        # (upper bound on matches, sorted IDs or None to build them, test of one course) per filter
+        filters = []
+        if department is not None:
+            ids = self.by_department.get(department, [])
+            filters.append((len(ids), ids, lambda course: course.department == department))
+        if instructor is not None:
+            ids = self.by_instructor.get(instructor, [])
+            filters.append((len(ids), ids, lambda course: course.instructor == instructor))
+        if day is not None:
+            ids = self.by_day.get(day, [])
+            filters.append((len(ids), ids, lambda course: day in course.days))
+        if credits is not None:
+            ids = self.by_credits.get(credits, [])
+            filters.append((len(ids), ids, lambda course: course.credits == credits))
+        if open_only:
+            filters.append((len(self.open_ids), self.open_ids, lambda course: not course.is_full()))
+        if start_after is not None or end_before is not None:
+            low = self._minutes(start_after) if start_after is not None else -1
+            high = self._minutes(end_before) if end_before is not None else 24 * 60
+            start = bisect.bisect_left(self.by_start, (low, ""))
+            end = bisect.bisect_right(self.by_start, (high, "\uffff"))
+
+            def in_window(course):
+                if course.start_time is None or not low <= self._minutes(course.start_time) <= high:
+                    return False
+                return end_before is None or (course.end_time is not None and course.end_time <= end_before)
+            filters.append((end - start, None, in_window))
+
+        offset = (page - 1) * page_size
+        if not filters:
+            # No filters: page straight out of the sorted ID list
+            page_ids = self.all_ids[offset:offset + page_size]
+            return [self.courses[course_id] for course_id in page_ids], len(self.all_ids)
+
+        # Walk the smallest list and test the other filters on each of its courses directly,
+        # rather than building a set out of every larger list
+        filters.sort(key=lambda entry: entry[0])
+        _, ids, test = filters[0]
+        tests = [other for _, _, other in filters[1:]]
+        if ids is None:
+            # The time window is the smallest: start from its slice of by_start, whose end
+            # times still have to be checked
+            ids = sorted(course_id for _, course_id in self.by_start[start:end])
+            tests.append(test)
+        matches = [course for course in map(self.courses.__getitem__, ids)
+                   if all(other(course) for other in tests)]
+        return matches[offset:offset + page_size], len(matches)
+
+    def departments(self):
+        """Map each department to its courses, both sorted"""
+        return {department: [self.courses[course_id] for course_id in ids]
+                for department, ids in sorted(self.by_department.items()) if ids}
+
+
+class FileLock:
+    """Advisory lock on a file, shared by every process that uses the same data directory"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self, exclusive=True):
+        if self._file is None:
+            self._file = open(self.path, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            return
+        # msvcrt only has exclusive locks, and LK_LOCK gives up after about ten seconds
+        self._file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def release(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _locked(exclusive):
+    """Run an EnrollmentSystem method under the data-directory lock when the directory is shared"""
+    def decorate(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.lock is None:
+                return method(self, *args, **kwargs)
+            with self.locked(exclusive):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Metrics:
+    """Opt-in latency histograms and I/O counters, flushed to a Prometheus text-format file.
+
+    instrument() replaces the timed methods on one EnrollmentSystem (and its storage) with
+    wrappers, so a system created without metrics runs the original methods untouched.
+    Counters are recorded once per file or per check, never per CSV row.
+    """
+
+    TIMED_METHODS = ("authenticate_student", "enroll_student", "drop_course", "get_student_courses")
+    STORAGE_METHODS = ("load", "import_from", "add_student", "enroll", "drop", "add_to_waitlist",
+                       "remove_from_waitlist")
+    BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+    COUNTERS = {
+        "file_bytes_read": "Bytes read from data files",
+        "file_bytes_written": "Bytes written to data files",
+        "csv_rows_parsed": "CSV rows parsed while loading",
+        "conflict_checks": "Schedule conflict checks performed",
+    }
+
+    def __init__(self, path, flush_interval=10.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.histograms = {}  # (metric, label) -> [bucket counts..., +Inf count, sum]
+        self.counters = {}  # (name, file label or "") -> value
+        self._last_flush = monotonic()
+
+    def instrument(self, system):
+        """Time the public operations of an EnrollmentSystem and the calls it makes to its storage"""
+        for name in self.TIMED_METHODS:
+            setattr(system, name, self._timed("operation", name, getattr(system, name)))
+        if system.storage is not None:
+            for name in self.STORAGE_METHODS:
+                setattr(system.storage, name, self._timed("storage", name, getattr(system.storage, name)))
+
+    def _timed(self, metric, label, method):
+        observe = self.observe
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            started = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                observe(metric, label, perf_counter() - started)
+        return timed
+
+    def observe(self, metric, label, seconds):
+        """Add one latency sample to a histogram"""
+        key = (metric, label)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = [0] * (len(self.BUCKETS) + 1) + [0.0]
+        histogram[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        histogram[-1] += seconds
+        self.maybe_flush()
+
+    def count(self, name, amount=1, file=""):
+        """Increase a counter, optionally labelled with a data file name"""
+        key = (name, file)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def maybe_flush(self):
+        if monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def render(self):
+        """Current values in the Prometheus text exposition format"""
+        lines = []
+        for metric, help_text in (("operation", "Latency of EnrollmentSystem operations"),
+                                  ("storage", "Latency of storage backend calls")):
+            name = f"registration_{metric}_seconds"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (kind, label), histogram in sorted(self.histograms.items()):
+                if kind != metric:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.BUCKETS + ("+Inf",), histogram):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{metric}="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{metric}="{label}"}} {histogram[-1]:.9f}')
+                lines.append(f'{name}_count{{{metric}="{label}"}} {cumulative}')
+        for counter, help_text in self.COUNTERS.items():
+            name = f"registration_{counter}_total"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (key, file), value in sorted(self.counters.items()):
+                if key == counter:
+                    lines.append(f'{name}{{file="{file}"}} {value}' if file else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Atomically rewrite the metrics file"""
+        self._last_flush = monotonic()
+        temp_file = self.path + ".tmp"
+        with open(temp_file, 'w') as file:
+            file.write(self.render())
+        os.replace(temp_file, self.path)
 
 
 class EnrollmentSystem:
-    def __init__(self):
+    def __init__(self, storage=None, debug=False, data_dir="data", metrics=None, lazy=False, cache_size=1024,
+                 log_events=False, shared=False):
+        if lazy and storage is None:
+            raise ValueError("Lazy loading needs an indexed store such as SQLiteStorage")
+        if shared and storage is not None:
+            raise ValueError("Shared mode coordinates the CSV files; SQLite handles its own locking")
         self.students_file = 'students.csv'
         self.courses_file = 'courses.csv'
+        self.storage = storage  # None keeps everything in the CSV files
+        self.lazy = lazy  # Load only the catalog and fetch students from storage on demand
+        self.cache_size = cache_size  # Students kept in memory in lazy mode
+        self.debug = debug  # Cross-check cached counters against the enrollment sets
         self.students = {}
         self.courses = {}
+        self.waitlists = {}  # course_id -> Waitlist
+        self.ids = IdTables()  # Interned course and student IDs, replaced on every full load
         self.max_credits = 10  # Maximum credits a student can take
-        self.data_dir = "data"
+        self.data_dir = data_dir
+        self.journal_file = 'enrollments.journal'
+        self.autocommit = True  # Flush every enroll/drop to the journal immediately
+        self.compact_threshold = 500  # Journal records before compact_if_due rewrites the CSVs
+        self.compact_limit = 50000  # Journal records at which commit compacts even without an idle moment
+        self._journal_buffer = []
+        self._journal_records = 0
+        self._slot_index = None
+        self._catalog = None
+        self._loading = False
+        self.snapshot_file = 'registration.snapshot'
+        self._snapshot_pending = False
+        self.event_file = 'events.log'
+        self.log_events = log_events  # Append every change event to event_file as a JSON line
+        self._subscribers = []
+        self._event_buffer = []  # Events published since the last commit
+        self._event_seq = 0
+        self.version_file = 'registration.version'  # Bumped by every compaction
+        self._generation = None  # Version this process last loaded
+        self._journal_offset = 0  # Bytes of the journal already applied to memory
+        self.lock = None  # FileLock when several processes share the data directory
+        self._lock_depth = 0
+        self._lock_exclusive = False
+        self.metrics = metrics  # Metrics instance, or None to run uninstrumented
+        if metrics is not None:
+            metrics.instrument(self)
         self.ensure_data_directory()
-        self.load_data()
+        if log_events:
+            self._event_seq = self._read_last_event_seq()
+        if shared:
+            self.lock = FileLock(os.path.join(self.data_dir, "registration.lock"))
+            # The first refresh finds no loaded version and does the full load under the lock
+            self.refresh(exclusive=True)
+        else:
+            self.load_data()
+        self.id_allocator = StudentIdAllocator(os.path.join(self.data_dir, "student_id.counter"),
+                                               lambda student_id: student_id in self.students)
     
     def ensure_data_directory(self):
         """Create data directory if it doesn't exist"""
@@ -130,16 +1307,134 @@ class EnrollmentSystem:
             self.data_dir = ""
     
     def load_data(self):
-        """Load student and course data from CSV files"""
+        """Load student and course data from the storage backend or CSV files"""
+        # Counters are rebuilt in one pass at the end, so skip per-change debug checks meanwhile
+        self._loading = True
+        self._journal_records = 0
+        self._journal_offset = 0
+        self.ids = IdTables()
+        try:
+            if self.storage is not None:
+                seeded = False
+                if self.storage.is_empty():
+                    # First run against a new database: seed it from the CSV files
+                    self._load_csv_data()
+                    self.storage.import_from(self)
+                    seeded = True
+                if self.lazy:
+                    # Courses and waitlists only; students come from the database as they are used
+                    self.courses, self.waitlists = {}, {}
+                    self.students = StudentCache(self.storage, self.courses, self.cache_size, self.ids)
+                    self.storage.load_catalog(self)
+                elif not seeded:
+                    self.storage.load(self)
+            else:
+                self._load_csv_data()
+        finally:
+            self._loading = False
+        if self.storage is not None or self._snapshot_pending:
+            self._rebuild_schedules()
+        else:
+            # Counters come from the snapshot and the journal replay keeps them current
+            self._slot_index = None
+            self._catalog = None
+            if self.debug:
+                self._raise_on_problems(self.verify_counters())
+        if self._snapshot_pending and self.storage is None:
+            self.save_snapshot()
+        self._snapshot_pending = False
+        if self.metrics is not None:
+            self.metrics.flush()
+
+    def _load_csv_data(self):
+        """Load student and course data from CSV files, or from the snapshot when it is current"""
+        if self._load_snapshot():
+            return
+
         students_file = os.path.join(self.data_dir, self.students_file)
         if not os.path.exists(students_file):
             print(f"Warning: {students_file} not found. Creating a new file.")
             self.create_empty_students_file()  
 
-        self.preload_students()
-        self._load_students()
+        # Courses first, so students' cached totals can be computed as their schedules are read
         self._load_courses()
+        self._load_students()
+        if not self.students:
+            # Only seed the sample students when there is no student data at all
+            self.preload_students()
         self._load_enrollments()
+        self._load_waitlists()
+        self._replay_journal()
+        self._snapshot_pending = True
+
+    def _snapshot_sources(self):
+        """(size, mtime) of every CSV the snapshot is built from, used to detect stale snapshots"""
+        sources = {}
+        for name in (self.students_file, self.courses_file, "enrollments.csv", "waitlists.csv"):
+            try:
+                stat = os.stat(os.path.join(self.data_dir, name))
+                sources[name] = [stat.st_size, stat.st_mtime_ns]
+            except FileNotFoundError:
+                sources[name] = None
+        return sources
+
+    def save_snapshot(self):
+        """Write the loaded dictionaries to a versioned, checksummed binary snapshot"""
+        journal_file = os.path.join(self.data_dir, self.journal_file)
+        header = json.dumps({
+            "sources": self._snapshot_sources(),
+            "journal_offset": os.path.getsize(journal_file) if os.path.exists(journal_file) else 0,
+            "journal_records": self._journal_records,
+        }).encode()
+        payload = pickle.dumps((self.students, self.courses, self.waitlists), protocol=pickle.HIGHEST_PROTOCOL)
+
+        snapshot_file = os.path.join(self.data_dir, self.snapshot_file)
+        # Per-process name, since processes sharing the directory may rebuild it at the same time
+        temp_file = f"{snapshot_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'wb') as file:
+            file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+            file.write(header)
+            file.write(hashlib.sha256(payload).digest())
+            file.write(payload)
+        os.replace(temp_file, snapshot_file)
+        if self.metrics is not None:
+            self._record_write(snapshot_file)
+
+    def _load_snapshot(self):
+        """Load the binary snapshot if it matches the CSV files, then replay the newer journal records"""
+        snapshot_file = os.path.join(self.data_dir, self.snapshot_file)
+        try:
+            with open(snapshot_file, 'rb') as file:
+                magic, version, header_length = SNAPSHOT_HEADER.unpack(file.read(SNAPSHOT_HEADER.size))
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    return False
+                header = json.loads(file.read(header_length))
+                if header["sources"] != self._snapshot_sources():
+                    return False
+                journal_file = os.path.join(self.data_dir, self.journal_file)
+                journal_size = os.path.getsize(journal_file) if os.path.exists(journal_file) else 0
+                if journal_size < header["journal_offset"]:
+                    return False
+                checksum = file.read(32)
+                payload = file.read()
+        except (OSError, ValueError, KeyError, struct.error):
+            return False
+
+        if hashlib.sha256(payload).digest() != checksum:
+            print("Warning: snapshot checksum mismatch; reloading from CSV files.")
+            return False
+        try:
+            with _unpickling_into(self.ids):
+                students, courses, waitlists = pickle.loads(payload)
+        except Exception:
+            return False
+
+        self.students, self.courses, self.waitlists = students, courses, waitlists
+        if self.metrics is not None:
+            self._record_read(snapshot_file)
+        self._replay_journal(header["journal_offset"])
+        self._journal_records += header["journal_records"]
+        return True
 
     def create_empty_students_file(self):
         """Create an empty students.csv file"""
@@ -164,12 +1459,14 @@ class EnrollmentSystem:
                 major = row.get('major') or row.get('Major')
             
                 if student_id and name and password:  # Make sure essential data exists
-                    self.students[student_id] = Student(student_id, name, password, email, major)
+                    self.students[student_id] = Student(student_id, name, password, email, major, self.ids)
                 
                     # Handle registered courses if present
                     registered_courses = row.get('registered_courses') or row.get('RegisteredCourses')
                     if registered_courses:
-                        self.students[student_id].registered_courses = set(registered_courses.split(','))
+                        self.students[student_id].set_registered_courses(registered_courses.split(','), self.courses)
+            if self.metrics is not None:
+                self._record_read(students_file, reader.line_num - 1)
     
     def _load_courses(self):
         """Load course data from CSV file"""
@@ -192,15 +1489,8 @@ class EnrollmentSystem:
                     
                     days = row[6].split(',') if row[6] else []
                     
-                    start_time = None
-                    if row[7]:
-                        h, m = map(int, row[7].split(':'))
-                        start_time = time(h, m)
-                    
-                    end_time = None
-                    if row[8]:
-                        h, m = map(int, row[8].split(':'))
-                        end_time = time(h, m)
+                    start_time = parse_time(row[7])
+                    end_time = parse_time(row[8])
                     
                     course = Course(
                         course_id, 
@@ -211,13 +1501,16 @@ class EnrollmentSystem:
                         credits,
                         days, 
                         start_time, 
-                        end_time
+                        end_time,
+                        self.ids
                     )
                     
                     if len(row) >= 10 and row[9]:
-                        course.enrolled_students = set(row[9].split(','))
+                        course.set_enrolled_students(row[9].split(','))
                     
                     self.courses[course_id] = course
+            if self.metrics is not None:
+                self._record_read(courses_file, reader.line_num - 1)
     
     def preload_students(self):
         """Preload sample students data"""
@@ -228,7 +1521,7 @@ class EnrollmentSystem:
         ]
 
         for student_id, name, password, email, major in students_data:
-            self.students[student_id] = Student(student_id, name, password, email, major)
+            self.students[student_id] = Student(student_id, name, password, email, major, self.ids)
     
         # Save the preloaded students data
         self.save_students()
@@ -238,29 +1531,29 @@ class EnrollmentSystem:
         # Computer Science Department
         cs_courses = [
             Course("CS101", "Introduction to Programming", "Computer Science", "Dr. Smith", 5, 2, 
-                  ["Mon", "Wed"], time(9, 0), time(10, 30)),
+                  ["Mon", "Wed"], time(9, 0), time(10, 30), ids=self.ids),
             Course("CS201", "Data Structures", "Computer Science", "Dr. Johnson", 5, 2, 
-                  ["Tue", "Thu"], time(11, 0), time(12, 30)),
+                  ["Tue", "Thu"], time(11, 0), time(12, 30), ids=self.ids),
             Course("CS301", "Algorithms", "Computer Science", "Dr. Lee", 5, 2, 
-                  ["Mon", "Wed"], time(13, 0), time(14, 30)),
+                  ["Mon", "Wed"], time(13, 0), time(14, 30), ids=self.ids),
             Course("CS350", "Database Systems", "Computer Science", "Dr. Garcia", 5, 2, 
-                  ["Tue", "Thu"], time(14, 0), time(15, 30)),
+                  ["Tue", "Thu"], time(14, 0), time(15, 30), ids=self.ids),
             Course("CS401", "Artificial Intelligence", "Computer Science", "Dr. Wong", 5, 2, 
-                  ["Mon", "Wed"], time(15, 0), time(16, 30))
+                  ["Mon", "Wed"], time(15, 0), time(16, 30), ids=self.ids)
         ]
         
         # Mathematics Department
         math_courses = [
             Course("MATH101", "Calculus I", "Mathematics", "Dr. Brown", 5, 2, 
-                  ["Mon", "Wed", "Fri"], time(10, 0), time(11, 0)),
+                  ["Mon", "Wed", "Fri"], time(10, 0), time(11, 0), ids=self.ids),
             Course("MATH201", "Linear Algebra", "Mathematics", "Dr. Wilson", 5, 2, 
-                  ["Tue", "Thu"], time(9, 0), time(10, 30)),
+                  ["Tue", "Thu"], time(9, 0), time(10, 30), ids=self.ids),
             Course("MATH301", "Differential Equations", "Mathematics", "Dr. Taylor", 5, 2, 
-                  ["Mon", "Wed"], time(14, 0), time(15, 30)),
+                  ["Mon", "Wed"], time(14, 0), time(15, 30), ids=self.ids),
             Course("MATH350", "Probability Theory", "Mathematics", "Dr. Martinez", 5, 2, 
-                  ["Tue", "Thu"], time(13, 0), time(14, 30)),
+                  ["Tue", "Thu"], time(13, 0), time(14, 30), ids=self.ids),
             Course("MATH401", "Real Analysis", "Mathematics", "Dr. Anderson", 5, 2, 
-                  ["Mon", "Wed", "Fri"], time(13, 0), time(14, 0))
+                  ["Mon", "Wed", "Fri"], time(13, 0), time(14, 0), ids=self.ids)
         ]
         
         # Add all courses to the course dictionary
@@ -283,59 +1576,373 @@ class EnrollmentSystem:
                 if len(row) >= 2:
                     student_id, course_id = row[0], row[1]
                     if student_id in self.students and course_id in self.courses:
-                        self.students[student_id].registered_courses.add(course_id)
-                        self.courses[course_id].enrolled_students.add(student_id)
+                        self._link(self.students[student_id], self.courses[course_id])
+            if self.metrics is not None:
+                self._record_read(enrollments_file, reader.line_num - 1)
+
+    def _load_waitlists(self):
+        """Load waitlists, stored in priority order, from CSV file"""
+        waitlists_file = os.path.join(self.data_dir, "waitlists.csv")
+        if not os.path.exists(waitlists_file):
+            return
+
+        with open(waitlists_file, 'r', newline='') as file:
+            reader = csv.reader(file)
+            next(reader)  # Skip header
+            for row in reader:
+                if len(row) >= 4:
+                    course_id, student_id, standing, requested_at = row[0], row[1], row[2], row[3]
+                    if student_id in self.students and course_id in self.courses:
+                        self.get_waitlist(course_id).join(student_id, int(standing or 0), requested_at)
+            if self.metrics is not None:
+                self._record_read(waitlists_file, reader.line_num - 1)
+
+    def _replay_journal(self, offset=0):
+        """Apply records written since the last compaction (or since a byte offset)"""
+        journal_file = os.path.join(self.data_dir, self.journal_file)
+        self._journal_offset = offset
+        if not os.path.exists(journal_file):
+            return
+
+        with open(journal_file, 'rb') as file:
+            file.seek(offset)
+            data = file.read()
+        # Stop after the last complete line: a crash mid-write can leave a truncated one
+        end = data.rfind(b"\n") + 1
+        self._journal_offset = offset + end
+        if end:
+            reader = csv.reader(data[:end].decode().splitlines())
+            for row in reader:
+                if len(row) < 3:
+                    continue
+                op, student_id, course_id = row[0], row[1], row[2]
+                if op == 'R':
+                    if student_id not in self.students and len(row) >= 8:
+                        self.students[student_id] = Student(student_id, *row[4:8], self.ids)
+                    self._journal_records += 1
+                    continue
+                if student_id not in self.students or course_id not in self.courses:
+                    continue
+                student = self.students[student_id]
+                course = self.courses[course_id]
+                if op == 'E':
+                    self._link(student, course)
+                elif op == 'D':
+                    self._unlink(student, course)
+                elif op == 'W' and len(row) >= 5:
+                    self.get_waitlist(course_id).join(student_id, int(row[4] or 0), row[3])
+                elif op == 'L':
+                    self.get_waitlist(course_id).leave(student_id)
+                self._journal_records += 1
+            if self.metrics is not None:
+                self._record_read(journal_file, reader.line_num, end)
+
+    def _log_enrollment(self, op, student_id, course_id, timestamp=None, *extra):
+        """Queue a journal record ('E' enroll, 'D' drop, 'W' join waitlist, 'L' leave waitlist,
+        'R' register) and commit it if autocommit is on"""
+        timestamp = timestamp or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._journal_buffer.append([op, student_id, course_id, timestamp, *extra])
+        if self.autocommit:
+            self.commit()
+
+    @_locked(exclusive=True)
+    def commit(self):
+        """Append queued journal records with a single fsync, then deliver their events"""
+        if self.storage is not None or not self._journal_buffer:
+            self._deliver_events()
+            return
+        journal_file = os.path.join(self.data_dir, self.journal_file)
+        trim_torn_tail(journal_file)
+        with open(journal_file, 'a', newline='') as file:
+            start = file.tell()
+            writer = csv.writer(file)
+            writer.writerows(self._journal_buffer)
+            file.flush()
+            os.fsync(file.fileno())
+            # Everything up to here is in memory already: earlier records were replayed before this write
+            self._journal_offset = os.fstat(file.fileno()).st_size
+            if self.metrics is not None:
+                self._record_write(journal_file, file.tell() - start)
+        self._journal_records += len(self._journal_buffer)
+        self._journal_buffer = []
+        self._deliver_events()
+
+        # Compaction normally happens in compact_if_due at an idle moment; this only bounds the
+        # journal (and the replay at the next start) if no idle moment ever comes
+        if self._journal_records >= self.compact_limit:
+            self.compact()
+
+    def compaction_due(self):
+        """Whether compact_threshold journal records have piled up since the last compaction"""
+        return self.storage is None and self._journal_records >= self.compact_threshold
+
+    @_locked(exclusive=True)
+    def compact_if_due(self):
+        """Compact if it is due. Call this when nobody is waiting (the server between requests,
+        the menu while it waits for input), so no request pays for rewriting the CSVs.
+        Returns whether it compacted."""
+        if not self.compaction_due():
+            return False
+        self.compact()
+        return True
+
+    @_locked(exclusive=True)
+    def compact(self):
+        """Fold the journal into the CSV snapshot and start a fresh journal"""
+        if self.storage is not None:
+            return
+        # The snapshot already reflects any records still waiting in the buffer
+        self._journal_buffer = []
+        self.save_data()
+        self._deliver_events()
+        # Truncate only after the new CSVs are durably in place (save_data fsyncs the files and
+        # the directory); replaying a stale journal over them is harmless
+        journal_file = os.path.join(self.data_dir, self.journal_file)
+        if os.path.exists(journal_file):
+            with open(journal_file, 'w') as file:
+                os.fsync(file.fileno())
+        self._journal_records = 0
+        self._journal_offset = 0
+        # Tell other processes their in-memory copy and journal offset are out of date
+        self._generation = (self._read_generation() or 0) + 1
+        self._write_generation(self._generation)
+        # The CSVs just changed, so refresh the snapshot to keep the next start warm
+        self.save_snapshot()
+
+    @contextmanager
+    def locked(self, exclusive=True):
+        """Hold the data-directory lock in shared mode.
+
+        The outermost entry first catches up with what other processes have committed, and
+        changes made under an exclusive lock are committed before it is released.
+        """
+        if self._lock_depth:
+            if exclusive and not self._lock_exclusive:
+                raise RuntimeError("Cannot take the data-directory lock for writing inside a read")
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+
+        self.lock.acquire(exclusive)
+        self._lock_depth = 1
+        self._lock_exclusive = exclusive
+        try:
+            self._sync()
+            yield
+        finally:
+            try:
+                if exclusive:
+                    self.commit()
+            finally:
+                self._lock_depth = 0
+                self.lock.release()
+
+    def refresh(self, exclusive=False):
+        """Apply whatever other processes sharing the data directory have committed"""
+        if self.lock is not None:
+            with self.locked(exclusive):
+                pass
+
+    def _sync(self):
+        """Replay the journal delta, or reload everything after another process compacted"""
+        generation = self._read_generation()
+        journal_file = os.path.join(self.data_dir, self.journal_file)
+        journal_size = os.path.getsize(journal_file) if os.path.exists(journal_file) else 0
+        if generation != self._generation or journal_size < self._journal_offset:
+            self.students, self.courses, self.waitlists = {}, {}, {}
+            self.load_data()
+            self._generation = generation
+        elif journal_size > self._journal_offset:
+            self._replay_journal(self._journal_offset)
+        if self.log_events:
+            # Other processes append to the same event file, so number on from its last event
+            self._event_seq = max(self._event_seq, self._read_last_event_seq())
+
+    def _read_generation(self):
+        try:
+            with open(os.path.join(self.data_dir, self.version_file), 'r') as file:
+                return int(file.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_generation(self, generation):
+        version_file = os.path.join(self.data_dir, self.version_file)
+        temp_file = f"{version_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w') as file:
+            file.write(str(generation))
+        os.replace(temp_file, version_file)
     
+    @property
+    def last_event_seq(self):
+        """Sequence number of the last event published; the loaded data reflects every event up to it"""
+        return self._event_seq
+
+    def subscribe(self, callback):
+        """Call callback(event) after every enroll, drop, register and course update.
+
+        Events are dicts with seq, type, time and the IDs involved. With autocommit off they
+        are held back until commit has made the change durable. Returns a function that
+        removes the subscription.
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def _publish(self, event_type, **fields):
+        if not self._subscribers and not self.log_events:
+            return
+        self._event_seq += 1
+        event = {"seq": self._event_seq, "type": event_type,
+                 "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), **fields}
+        self._event_buffer.append(event)
+        if self.autocommit:
+            self._deliver_events()
+
+    def _course_event(self, event_type, student_id, course):
+        self._publish(event_type, student_id=student_id, course_id=course.course_id,
+                      department=course.department, instructor=course.instructor, credits=course.credits)
+
+    def _deliver_events(self):
+        """Pass buffered events to the subscribers and append them to the event file (derived data, so no fsync)"""
+        if not self._event_buffer:
+            return
+        events, self._event_buffer = self._event_buffer, []
+        for event in events:
+            for callback in list(self._subscribers):
+                callback(event)
+        if self.log_events:
+            with open(os.path.join(self.data_dir, self.event_file), 'a') as file:
+                file.write("\n".join(json.dumps(event) for event in events) + "\n")
+
+    def _read_last_event_seq(self):
+        """Sequence number of the last event in the event file, read from its tail"""
+        event_file = os.path.join(self.data_dir, self.event_file)
+        try:
+            with open(event_file, 'rb') as file:
+                file.seek(max(os.path.getsize(event_file) - 4096, 0))
+                lines = file.read().splitlines()
+        except OSError:
+            return 0
+        for line in reversed(lines):
+            try:
+                return json.loads(line)["seq"]
+            except (ValueError, KeyError):
+                continue
+        return 0
+
+    def _record_read(self, path, rows=0, size=None):
+        """Count the bytes read from a data file and the CSV rows parsed from it"""
+        name = os.path.basename(path)
+        self.metrics.count("file_bytes_read", os.path.getsize(path) if size is None else size, name)
+        if rows:
+            self.metrics.count("csv_rows_parsed", rows, name)
+
+    def _record_write(self, path, size=None):
+        """Count the bytes written to a data file"""
+        self.metrics.count("file_bytes_written", os.path.getsize(path) if size is None else size,
+                           os.path.basename(path))
+        self.metrics.maybe_flush()
+
+    @_locked(exclusive=True)
     def save_data(self):
-        """Save all data to CSV files"""
+        """Save all data to CSV files.
+
+        Each file is replaced atomically, and the directory is fsynced at the end, so once this
+        returns every file is durable; a crash before then leaves each file old or new, and the
+        journal (which compact only truncates afterwards) brings the old ones up to date.
+        """
         self.save_students()
         self.save_courses()
         self.save_enrollments()
+        self.save_waitlists()
+        fsync_directory(self.data_dir)
     
     def save_students(self):
         """Save student data to CSV file"""
         students_file = os.path.join(self.data_dir, "students.csv")
-        with open(students_file, 'w', newline='') as file:
+        with atomic_write(students_file) as file:
             writer = csv.writer(file)
             writer.writerow(["StudentID", "Name", "Password", "Email", "Major", "RegisteredCourses"])
             for student in self.students.values():
                 writer.writerow(student.to_csv_row())
+        if self.metrics is not None:
+            self._record_write(students_file)
     
     def save_courses(self):
         """Save course data to CSV file"""
         courses_file = os.path.join(self.data_dir, "courses.csv")
-        with open(courses_file, 'w', newline='') as file:
+        with atomic_write(courses_file) as file:
             writer = csv.writer(file)
             writer.writerow(["CourseID", "Name", "Department", "Instructor", "MaxStudents", "Credits", 
                             "Days", "StartTime", "EndTime", "EnrolledStudents"])
             for course in self.courses.values():
                 writer.writerow(course.to_csv_row())
+        if self.metrics is not None:
+            self._record_write(courses_file)
     
     def save_enrollments(self):
         """Save enrollment relationships to CSV file"""
         enrollments_file = os.path.join(self.data_dir, "enrollments.csv")
-        with open(enrollments_file, 'w', newline='') as file:
+        with atomic_write(enrollments_file) as file:
             writer = csv.writer(file)
             writer.writerow(["StudentID", "CourseID", "EnrollmentDate"])
             for student_id, student in self.students.items():
                 for course_id in student.registered_courses:
                     writer.writerow([student_id, course_id, datetime.now().strftime("%Y-%m-%d")])
+        if self.metrics is not None:
+            self._record_write(enrollments_file)
+    
+    def save_waitlists(self):
+        """Save waitlists to CSV file, each in priority order"""
+        waitlists_file = os.path.join(self.data_dir, "waitlists.csv")
+        with atomic_write(waitlists_file) as file:
+            writer = csv.writer(file)
+            writer.writerow(["CourseID", "StudentID", "Standing", "RequestedAt"])
+            for course_id, waitlist in self.waitlists.items():
+                for student_id, standing, requested_at in waitlist.to_rows():
+                    writer.writerow([course_id, student_id, standing, requested_at])
+        if self.metrics is not None:
+            self._record_write(waitlists_file)
     
+    @_locked(exclusive=True)
     def register_student(self, student):
         """Register a new student"""
         #if student.student_id in self.students:
             #return False, "Student ID already exists"
+        student.rebind(self.ids)
+        if self.storage is not None:
+            while True:
+                try:
+                    self.storage.add_student(student)
+                    break
+                except sqlite3.IntegrityError:
+                    # Another process sharing the database registered this ID first
+                    new_id = self.id_allocator.allocate()
+                    if new_id is None:
+                        return False, "No student IDs available"
+                    student.student_id = sys.intern(new_id)
+            self.students[student.student_id] = student
+            self._publish("register", student_id=student.student_id, major=student.major)
+            return True, "Student registered successfully"
+
         self.students[student.student_id] = student
-        file_path = "data/students.csv"
-        file_exists = os.path.isfile(file_path)
-        with open(file_path, "a", newline="") as f:
-            writer = csv.writer(f)
-            if not file_exists:
-                writer.writerow(["Student ID", "Name", "Password", "Email", "Major", "Registered Courses"])
-            writer.writerow(student.to_csv_row())
+
+        # Journaled like enrollments: students.csv is only rewritten by compaction, so an append
+        # here can never race with another process truncating it
+        self._log_enrollment('R', student.student_id, '', None,
+                             student.name, student.password, student.email, student.major)
+        self._publish("register", student_id=student.student_id, major=student.major)
 
         return True, "Student registered successfully"
     
+    @_locked(exclusive=True)
+    def allocate_student_id(self):
+        """Get a new unique student ID"""
+        return self.id_allocator.allocate()
+    
+    @_locked(exclusive=False)
     def authenticate_student(self, student_id, password):
         """Authenticate a student by ID and password"""
         student_id = student_id.upper()
@@ -347,6 +1954,7 @@ class EnrollmentSystem:
         
         return True, "Authentication successful"
     
+    @_locked(exclusive=True)
     def enroll_student(self, student_id, course_id):
         """Enroll a student in a course"""
         # Validate student and course exist
@@ -360,6 +1968,18 @@ class EnrollmentSystem:
         student = self.students[student_id]
         course = self.courses[course_id]
         
+        if self.storage is not None:
+            # The database is authoritative: it runs every check inside one transaction
+            success, message = self.storage.enroll(student_id, course_id, self.max_credits)
+            if success:
+                self._link(student, course)
+                self._remove_from_waitlist(student_id, course_id)
+                self._course_event("enroll", student_id, course)
+            else:
+                # A "Course is full" from the database is news if another process took the seats
+                self._refresh_seats(course)
+            return success, message
+
         # Check if student is already enrolled
         if course_id in student.registered_courses:
             return False, "Already enrolled in this course"
@@ -369,6 +1989,8 @@ class EnrollmentSystem:
             return False, "Course is full"
         
         # Check for schedule conflicts
+        if self.metrics is not None:
+            self.metrics.count("conflict_checks")
         if student.has_schedule_conflict(course, self.courses):
             return False, "Schedule conflict with existing course"
         
@@ -378,16 +2000,18 @@ class EnrollmentSystem:
             return False, f"Credit limit exceeded. Maximum: {self.max_credits}, Attempted: {new_total_credits}"
         
         # Enroll student
-        student.registered_courses.add(course_id)
-        course.enrolled_students.add(student_id)
+        self._link(student, course)
         
-        # Save changes
-        self.save_data()
+        # Record the change in the journal
+        self._log_enrollment('E', student_id, course_id)
+        self._remove_from_waitlist(student_id, course_id)
+        self._course_event("enroll", student_id, course)
         
         return True, "Enrollment successful"
     
+    @_locked(exclusive=True)
     def drop_course(self, student_id, course_id):
-        """Drop a student from a course"""
+        """Drop a student from a course and fill the seat from the waitlist"""
         # Validate student and course exist
         student_id = student_id.upper()
         if student_id not in self.students:
@@ -399,23 +2023,324 @@ class EnrollmentSystem:
         student = self.students[student_id]
         course = self.courses[course_id]
         
+        # The drop and every promotion it triggers are persisted in one commit
+        autocommit = self.autocommit
+        self.autocommit = False
+        try:
+            with self.storage.transaction() if self.storage is not None else nullcontext():
+                success, message = self._drop_enrollment(student, course)
+                if success:
+                    promoted = self._promote_from_waitlist(course)
+                    if promoted:
+                        message += f" ({len(promoted)} promoted from waitlist)"
+        finally:
+            self.autocommit = autocommit
+            if autocommit:
+                self.commit()
+        
+        return success, message
+
+    def _drop_enrollment(self, student, course):
+        if self.storage is not None:
+            success, message = self.storage.drop(student.student_id, course.course_id)
+            if success:
+                self._unlink(student, course)
+                self._course_event("drop", student.student_id, course)
+            return success, message
+
         # Check if student is enrolled in the course
-        if course_id not in student.registered_courses:
+        if course.course_id not in student.registered_courses:
             return False, "Not enrolled in this course"
         
         # Drop the course
-        student.registered_courses.remove(course_id)
-        course.enrolled_students.remove(student_id)
+        self._unlink(student, course)
         
-        # Save changes
-        self.save_data()
+        # Record the change in the journal
+        self._log_enrollment('D', student.student_id, course.course_id)
+        self._course_event("drop", student.student_id, course)
         
         return True, "Course dropped successfully"
+
+    def _promote_from_waitlist(self, course):
+        """Enroll waitlisted students into open seats, skipping anyone who no longer fits"""
+        waitlist = self.waitlists.get(course.course_id)
+        promoted = []
+        while waitlist and not course.is_full():
+            student_id = waitlist.pop()
+            self._persist_waitlist_leave(student_id, course.course_id)
+            # enroll_student re-checks conflicts and the credit limit with the usual rules
+            success, _ = self.enroll_student(student_id, course.course_id)
+            if success:
+                promoted.append(student_id)
+        return promoted
+
+    @_locked(exclusive=True)
+    def update_course(self, course_id, **changes):
+        """Change a course's name, department, instructor or capacity"""
+        course = self.courses.get(course_id)
+        if course is None:
+            return False, "Course not found"
+        unknown = set(changes) - {"name", "department", "instructor", "max_students"}
+        if unknown:
+            return False, f"Cannot update: {', '.join(sorted(unknown))}"
+        if "max_students" in changes:
+            changes["max_students"] = int(changes["max_students"])
+            self._refresh_seats(course)
+            if changes["max_students"] < course.enrolled_count:
+                return False, f"Capacity below current enrollment of {course.enrolled_count}"
+
+        for field, value in changes.items():
+            setattr(course, field, value)
+        # Department, instructor and open-seat indexes are rebuilt on the next query
+        self._catalog = None
+        if self.storage is not None:
+            self.storage.update_course(course)
+        else:
+            # Course edits are rare, so fold them in with a compaction rather than a journal op
+            self.compact()
+        self._publish("course_update", course_id=course_id, changes=changes)
+        if "max_students" in changes:
+            self._promote_from_waitlist(course)
+            self.commit()
+        return True, "Course updated"
+
+    def get_waitlist(self, course_id):
+        """Get the waitlist for a course, creating it if needed"""
+        if course_id not in self.waitlists:
+            self.waitlists[course_id] = Waitlist(course_id)
+        return self.waitlists[course_id]
+
+    @_locked(exclusive=True)
+    def join_waitlist(self, student_id, course_id, standing=0):
+        """Put a student on the waitlist of a full course"""
+        student_id = student_id.upper()
+        if student_id not in self.students:
+            return False, "Student not found"
+        
+        if course_id not in self.courses:
+            return False, "Course not found"
+        
+        student = self.students[student_id]
+        course = self.courses[course_id]
+        
+        if course_id in student.registered_courses:
+            return False, "Already enrolled in this course"
+        
+        # With a database, the seat count is read and the student queued in one transaction, so
+        # a seat freed by another process in between cannot leave them waiting for nothing
+        with self.storage.transaction() if self.storage is not None else nullcontext():
+            self._refresh_seats(course)
+            if not course.is_full():
+                return False, "Course has open seats; enroll directly"
+            
+            waitlist = self.get_waitlist(course_id)
+            if student_id in waitlist:
+                return False, "Already on the waitlist for this course"
+            
+            if self.metrics is not None:
+                self.metrics.count("conflict_checks")
+            if student.has_schedule_conflict(course, self.courses):
+                return False, "Schedule conflict with existing course"
+            
+            new_total_credits = student.get_total_credits(self.courses) + course.credits
+            if new_total_credits > self.max_credits:
+                return False, f"Credit limit exceeded. Maximum: {self.max_credits}, Attempted: {new_total_credits}"
+            
+            requested_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            waitlist.join(student_id, standing, requested_at)
+            if self.storage is not None:
+                self.storage.add_to_waitlist(course_id, student_id, standing, requested_at)
+            else:
+                self._log_enrollment('W', student_id, course_id, requested_at, standing)
+        
+        return True, f"Added to waitlist at position {waitlist.position(student_id)}"
+
+    @_locked(exclusive=True)
+    def leave_waitlist(self, student_id, course_id):
+        """Take a student off a course waitlist"""
+        student_id = student_id.upper()
+        if not self._remove_from_waitlist(student_id, course_id):
+            return False, "Not on the waitlist for this course"
+        return True, "Removed from waitlist"
+
+    @_locked(exclusive=False)
+    def get_waitlist_position(self, student_id, course_id):
+        """1-based waitlist position of a student, or None if not waitlisted"""
+        waitlist = self.waitlists.get(course_id)
+        return waitlist.position(student_id.upper()) if waitlist else None
+
+    def _remove_from_waitlist(self, student_id, course_id):
+        waitlist = self.waitlists.get(course_id)
+        if not waitlist or not waitlist.leave(student_id):
+            return False
+        self._persist_waitlist_leave(student_id, course_id)
+        return True
+
+    def _persist_waitlist_leave(self, student_id, course_id):
+        if self.storage is not None:
+            self.storage.remove_from_waitlist(course_id, student_id)
+        else:
+            self._log_enrollment('L', student_id, course_id)
     
+    @_locked(exclusive=True)
+    def enroll_many(self, requests):
+        """Enroll many (student_id, course_id) pairs, persisting them in one commit"""
+        return self._run_batch(self.enroll_student, requests)
+
+    @_locked(exclusive=True)
+    def drop_many(self, requests):
+        """Drop many (student_id, course_id) pairs, persisting them in one commit"""
+        return self._run_batch(self.drop_course, requests)
+
+    def _run_batch(self, operation, requests):
+        """Apply an enroll/drop operation to every pair and return (student_id, course_id, success, message) rows"""
+        results = []
+        autocommit = self.autocommit
+        self.autocommit = False
+        try:
+            # With SQLite every pair runs in a savepoint of one outer transaction
+            with self.storage.transaction() if self.storage is not None else nullcontext():
+                for student_id, course_id in requests:
+                    success, message = operation(student_id, course_id)
+                    results.append((student_id, course_id, success, message))
+        finally:
+            self.autocommit = autocommit
+            self.commit()
+        return results
+
+    def _link(self, student, course):
+        """Record an enrollment on both the student and the course"""
+        student.add_course(course)
+        if self.lazy:
+            # Rosters are not loaded in lazy mode; the count mirrors the database aggregate, which
+            # other processes may have moved too, so read it back rather than adding one
+            self._refresh_seats(course)
+        else:
+            course.add_student(student.student_id)
+        if self._catalog is not None:
+            self._catalog.update_seats(course)
+        if self.debug and not self._loading:
+            self._check_counters(student, course)
+
+    def _unlink(self, student, course):
+        """Remove an enrollment from both the student and the course"""
+        student.remove_course(course, self.courses)
+        if self.lazy:
+            self._refresh_seats(course)
+        else:
+            course.remove_student(student.student_id)
+        if self._catalog is not None:
+            self._catalog.update_seats(course)
+        if self.debug and not self._loading:
+            self._check_counters(student, course)
+
+    def _refresh_seats(self, course=None):
+        """Re-read seat counts (of one course, or all) from the database in lazy mode.
+
+        Lazy seat counts mirror the enrolled aggregate, which other processes sharing the
+        database also change, so they are re-read before deciding on is_full() and for display.
+        """
+        if not self.lazy:
+            return
+        counts = self.storage.seat_counts(course.course_id if course is not None else None)
+        for course_id, enrolled in counts.items():
+            current = self.courses.get(course_id)
+            if current is not None and current.enrolled_count != enrolled:
+                current.enrolled_count = enrolled
+                if self._catalog is not None:
+                    self._catalog.update_seats(current)
+
+    def _rebuild_schedules(self):
+        """Recompute cached schedule masks, credit totals and seat counts after a load"""
+        if not self.lazy:
+            # Lazily fetched students are rebuilt by StudentCache and seat counts come from storage
+            for student in self.students.values():
+                student.rebuild_totals(self.courses)
+            for course in self.courses.values():
+                course.enrolled_count = len(course.enrolled_students)
+        self._slot_index = None
+        self._catalog = None
+        if self.debug:
+            self._raise_on_problems(self.verify_counters())
+
+    def verify_counters(self):
+        """Compare every cached credit total and seat count against the sets they summarize"""
+        problems = []
+        # In lazy mode only the students in memory are checked, and seats against the database
+        students = self.students.cached() if self.lazy else self.students.values()
+        enrollments = self.storage.count_enrollments() if self.lazy else None
+        for student in students:
+            actual = student.count_credits(self.courses)
+            if student.total_credits != actual:
+                problems.append(f"Student {student.student_id}: cached credits {student.total_credits}, actual {actual}")
+        for course in self.courses.values():
+            actual = enrollments.get(course.course_id, 0) if self.lazy else len(course.enrolled_students)
+            if course.enrolled_count != actual:
+                problems.append(f"Course {course.course_id}: cached seats {course.enrolled_count}, actual {actual}")
+        return problems
+
+    def _check_counters(self, student, course):
+        """Debug check of the counters touched by a single enroll/drop"""
+        problems = []
+        actual_credits = student.count_credits(self.courses)
+        if student.total_credits != actual_credits:
+            problems.append(f"Student {student.student_id}: cached credits {student.total_credits}, actual {actual_credits}")
+        actual_seats = (self.storage.count_enrollments(course.course_id).get(course.course_id, 0) if self.lazy
+                        else len(course.enrolled_students))
+        if course.enrolled_count != actual_seats:
+            problems.append(f"Course {course.course_id}: cached seats {course.enrolled_count}, actual {actual_seats}")
+        self._raise_on_problems(problems)
+
+    @staticmethod
+    def _raise_on_problems(problems):
+        if problems:
+            raise AssertionError("Counter mismatch:\n" + "\n".join(problems))
+
+    def get_slot_index(self):
+        """Map each timetable slot to the IDs of the courses occupying it (built on first use)"""
+        if self._slot_index is None:
+            index = {}
+            for course in self.courses.values():
+                for slot in course.slots():
+                    index.setdefault(slot, set()).add(course.course_id)
+            self._slot_index = index
+        return self._slot_index
+
+    def find_courses_in_slots(self, mask):
+        """Get IDs of all courses occupying any slot set in a mask (e.g. a student's schedule_mask)"""
+        index = self.get_slot_index()
+        found = set()
+        while mask > 0:
+            low_bit = mask & -mask
+            found.update(index.get(low_bit.bit_length() - 1, ()))
+            mask ^= low_bit
+        return found
+
+    @_locked(exclusive=False)
     def get_available_courses(self):
         """Get list of all courses"""
+        self._refresh_seats()
         return list(self.courses.values())
+
+    def get_catalog(self):
+        """Get the indexed course catalog (built on first use, then kept current)"""
+        if self._catalog is None:
+            self._catalog = CourseCatalog(self.courses)
+        return self._catalog
+
+    @_locked(exclusive=False)
+    def search_courses(self, **filters):
+        """Query the catalog; see CourseCatalog.query for the filters. Returns (courses, total)"""
+        self._refresh_seats()
+        return self.get_catalog().query(**filters)
+
+    @_locked(exclusive=False)
+    def courses_by_department(self):
+        """Map each department to its courses, both sorted, with current seat counts"""
+        self._refresh_seats()
+        return self.get_catalog().departments()
     
+    @_locked(exclusive=False)
     def get_student_courses(self, student_id):
         """Get list of courses a student is enrolled in"""
         student_id = student_id.upper()
@@ -426,12 +2351,80 @@ class EnrollmentSystem:
         return [self.courses[course_id] for course_id in student.registered_courses if course_id in self.courses]
 
 
+class CourseListRenderer:
+    """Builds course listings and writes each screen to the terminal in one buffered write.
+
+    The fixed text of a course block (name, instructor, schedule, credits) is formatted once
+    per listing style and reused until the Course object is replaced; callers add the parts
+    that change, such as seat counts and status.
+    """
+
+    def __init__(self, page_size=10, out=None):
+        self.page_size = page_size
+        self.out = out
+        self._blocks = {}  # (style, course_id) -> (course, text)
+
+    def block(self, style, course):
+        """Cached text block for a course in the given listing style"""
+        key = (style, course.course_id)
+        cached = self._blocks.get(key)
+        if cached is None or cached[0] is not course:
+            cached = (course, self._format(style, course))
+            self._blocks[key] = cached
+        return cached[1]
+
+    @staticmethod
+    def _format(style, course):
+        schedule = course.schedule_str()
+        if style == "catalog":
+            return (f"{course.course_id}: {course.name}\n"
+                    f"  Instructor: {course.instructor}\n"
+                    f"  Schedule: {schedule}\n"
+                    f"  Credits: {course.credits}\n")
+        if style == "schedule":
+            return (f"{course.course_id}: {course.name}\n"
+                    f"  Department: {course.department}\n"
+                    f"  Instructor: {course.instructor}\n"
+                    f"  Schedule: {schedule}\n"
+                    f"  Credits: {course.credits}\n")
+        if style == "enroll":
+            return (f"{course.course_id}: {course.name} ({course.department})\n"
+                    f"   Schedule: {schedule}\n"
+                    f"   Credits: {course.credits}\n"
+                    f"   Instructor: {course.instructor}\n")
+        raise ValueError(f"Unknown listing style: {style}")
+
+    def invalidate(self, course_id):
+        """Forget the cached blocks of a course whose details changed"""
+        for style in ("catalog", "schedule", "enroll"):
+            self._blocks.pop((style, course_id), None)
+
+    def write(self, text):
+        """Write a whole screen at once"""
+        out = self.out or sys.stdout
+        out.write(text)
+        out.flush()
+
+
 class UniversitySystem:
-    def __init__(self):
-        self.enrollment_system = EnrollmentSystem()
+    def __init__(self, storage=None, debug=False, page_size=10, metrics=None, lazy=False, log_events=False,
+                 shared=False):
+        self.enrollment_system = EnrollmentSystem(storage, debug, metrics=metrics, lazy=lazy, log_events=log_events,
+                                                  shared=shared)
         # self.enrollment_system.preload_students()
         self.current_student = None
+        self.renderer = CourseListRenderer(page_size)
+        self.enrollment_system.subscribe(self._on_event)
+
+    def _on_event(self, event):
+        if event["type"] == "course_update":
+            self.renderer.invalidate(event["course_id"])
     
+    def _idle(self):
+        """Housekeeping while a menu waits for the user: compact the journal if it is due"""
+        sys.stdout.flush()
+        self.enrollment_system.compact_if_due()
+
     def main_menu(self):
         """Display the main menu"""
         self._clear_screen()
@@ -443,6 +2436,7 @@ class UniversitySystem:
         print("3. Exit")
         print("=" * 50)
         
+        self._idle()
         choice = input("Enter your choice (1-3): ")
         
         if choice == '1':
@@ -450,6 +2444,9 @@ class UniversitySystem:
         elif choice == '2':
             self.register()
         elif choice == '3':
+            self.enrollment_system.compact()
+            if self.enrollment_system.metrics is not None:
+                self.enrollment_system.metrics.flush()
             print("Thank you for using the system. Goodbye!")
             exit()
         else:
@@ -490,7 +2487,12 @@ class UniversitySystem:
         print("                STUDENT REGISTRATION                 ")
         print("=" * 50)
         
-        student_id = generate_unique_student_id()
+        student_id = self.enrollment_system.allocate_student_id()
+        if student_id is None:
+            print("No student IDs are available. Please contact the registrar.")
+            input("Press Enter to continue...")
+            self.main_menu()
+            return
         print(f"Your generated Student ID is: {student_id}")
         #if not student_id:
          #   print("Student ID cannot be empty.")
@@ -525,7 +2527,6 @@ class UniversitySystem:
             return
         
         new_student = Student(student_id, name, password, email, major)
-        self.enrollment_system.students[student_id] = new_student
         self.current_student = new_student
 
         #file_exists = os.path.isfile("data/students.csv")
@@ -540,7 +2541,9 @@ class UniversitySystem:
         
         if success:
             print("Registration successful!")
-            self.current_student = self.enrollment_system.students[student_id]
+            if new_student.student_id != student_id:
+                print(f"Your Student ID was taken meanwhile; your Student ID is: {new_student.student_id}")
+            self.current_student = self.enrollment_system.students[new_student.student_id]
             input("Press Enter to continue...")
             self.student_menu()
         else:
@@ -553,6 +2556,10 @@ class UniversitySystem:
     def student_menu(self):
         """Display the student menu"""
         while True:
+            # Pick up changes made from other terminals sharing the data directory
+            self.enrollment_system.refresh()
+            self.current_student = self.enrollment_system.students.get(self.current_student.student_id,
+                                                                       self.current_student)
             self._clear_screen()
             print("=" * 50)
             print(f"    STUDENT DASHBOARD - {self.current_student.name}    ")
@@ -567,11 +2574,13 @@ class UniversitySystem:
             print("2. View My Schedule")
             print("3. Enroll in a Course")
             print("4. Drop a Course")
-            print("5. Logout")
+            print("5. Join a Course Waitlist")
+            print("6. Logout")
             print("=" * 50)
             
             try:
-                choice = input("Enter your choice (1-5): ")
+                self._idle()
+                choice = input("Enter your choice (1-6): ")
             
                 if choice == '1':
                     self.view_available_courses()
@@ -582,132 +2591,151 @@ class UniversitySystem:
                 elif choice == '4':
                     self.drop_a_course()
                 elif choice == '5':
+                    self.join_a_waitlist()
+                elif choice == '6':
                     self.current_student = None
                     print("Logged out successfully.")
                     input("Press Enter to continue...")
                     self.main_menu()
                     break
                 else:
-                    print("Invalid choice. Please enter a number between 1 and 5.")
+                    print("Invalid choice. Please enter a number between 1 and 6.")
                     input("Press Enter to continue...")
             except Exception as e:  # Use more specific exception handling
                 print(f"An error occurred: {e}")
                 input("Press Enter to continue...")
 
+    def _page_count(self, items):
+        page_size = self.renderer.page_size
+        return max(1, (len(items) + page_size - 1) // page_size)
+
+    def _page_items(self, items, page):
+        page_size = self.renderer.page_size
+        return items[page * page_size:(page + 1) * page_size]
+
     def view_available_courses(self):
-        """Display all available courses"""
-        self._clear_screen()
-        print("=" * 80)
-        print("                             AVAILABLE COURSES                               ")
-        print("=" * 80)
-        
-        courses = self.enrollment_system.get_available_courses()
-        
-        # Group courses by department
-        departments = {}
-        for course in courses:
-            if course.department not in departments:
-                departments[course.department] = []
-            departments[course.department].append(course)
-        
-        # Display courses by department
-        for dept, dept_courses in departments.items():
-            print(f"\n{dept} Department:")
-            print("-" * 80)
-            for course in dept_courses:
+        """Display all available courses, a page at a time"""
+        departments = self.enrollment_system.courses_by_department()
+        rows = [(dept, course) for dept, dept_courses in departments.items() for course in dept_courses]
+        pages = self._page_count(rows)
+        page = 0
+        
+        while True:
+            self._clear_screen()
+            parts = ["=" * 80 + "\n",
+                     "                             AVAILABLE COURSES                               \n",
+                     "=" * 80 + "\n"]
+            
+            # Display courses by department
+            last_dept = None
+            for dept, course in self._page_items(rows, page):
+                if dept != last_dept:
+                    parts.append(f"\n{dept} Department:\n" + "-" * 80 + "\n")
+                    last_dept = dept
                 # Check if student is already enrolled
                 enrolled = course.course_id in self.current_student.registered_courses
                 status = "Enrolled" if enrolled else "Available" if not course.is_full() else "Full"
-                
-                # Format course info
-                print(f"{course.course_id}: {course.name}")
-                print(f"  Instructor: {course.instructor}")
-                days_str = ", ".join(course.days)
-                time_str = f"{course.start_time.strftime('%H:%M')} - {course.end_time.strftime('%H:%M')}" if course.start_time and course.end_time else "N/A"
-                print(f"  Schedule: {days_str} {time_str}")
-                print(f"  Credits: {course.credits}")
-                print(f"  Enrollment: {len(course.enrolled_students)}/{course.max_students}")
-                print(f"  Status: {status}")
-                print("-" * 80)
-        
-        input("Press Enter to continue...")
+                parts.append(self.renderer.block("catalog", course))
+                parts.append(f"  Enrollment: {course.enrolled_count}/{course.max_students}\n"
+                             f"  Status: {status}\n" + "-" * 80 + "\n")
+            
+            if pages == 1:
+                self.renderer.write("".join(parts))
+                input("Press Enter to continue...")
+                return
+            
+            parts.append(f"Page {page + 1}/{pages}\n")
+            self.renderer.write("".join(parts))
+            choice = input("Enter n for next page, p for previous page, or press Enter to go back: ").strip().lower()
+            if choice == 'n' and page < pages - 1:
+                page += 1
+            elif choice == 'p' and page > 0:
+                page -= 1
+            elif choice == '':
+                return
     
     def view_my_schedule(self):
         """Display the student's current schedule"""
         self._clear_screen()
-        print("=" * 80)
-        print(f"                    MY SCHEDULE - {self.current_student.name}                     ")
-        print("=" * 80)
+        parts = ["=" * 80 + "\n",
+                 f"                    MY SCHEDULE - {self.current_student.name}                     \n",
+                 "=" * 80 + "\n"]
         
         courses = self.enrollment_system.get_student_courses(self.current_student.student_id)
         
         if not courses:
-            print("You are not enrolled in any courses.")
+            parts.append("You are not enrolled in any courses.\n")
         else:
             total_credits = self.current_student.get_total_credits(self.enrollment_system.courses)
-            print(f"Total Credits: {total_credits}/{self.enrollment_system.max_credits}")
-            print("-" * 80)
+            parts.append(f"Total Credits: {total_credits}/{self.enrollment_system.max_credits}\n")
+            parts.append("-" * 80 + "\n")
             
             # Sort courses by day and time
             courses.sort(key=lambda c: (
                 # Sort by day of week (Monday first)
-                min([["Mon", "Tue", "Wed", "Thu", "Fri"].index(day) if day in ["Mon", "Tue", "Wed", "Thu", "Fri"] else 6 for day in c.days], default=7),
+                min((DAY_INDEX.get(day, 6) for day in c.days), default=7),
                 # Then by start time
                 c.start_time if c.start_time else time(23, 59)
             ))
             
             for course in courses:
-                print(f"{course.course_id}: {course.name}")
-                print(f"  Department: {course.department}")
-                print(f"  Instructor: {course.instructor}")
-                days_str = ", ".join(course.days)
-                time_str = f"{course.start_time.strftime('%H:%M')} - {course.end_time.strftime('%H:%M')}" if course.start_time and course.end_time else "N/A"
-                print(f"  Schedule: {days_str} {time_str}")
-                print(f"  Credits: {course.credits}")
-                print("-" * 80)
+                parts.append(self.renderer.block("schedule", course))
+                parts.append("-" * 80 + "\n")
         
+        self.renderer.write("".join(parts))
         input("Press Enter to continue...")
     
     def enroll_in_course(self):
         """Enroll the student in a new course"""
         self._clear_screen()
-        print("=" * 50)
-        print("                COURSE ENROLLMENT                  ")
-        print("=" * 50)
+        header = "=" * 50 + "\n" + "                COURSE ENROLLMENT                  \n" + "=" * 50 + "\n"
         
-        # Show all available courses
-        courses = self.enrollment_system.get_available_courses()
+        # Courses with open seats come from the catalog's open-seat index
+        open_courses, total = self.enrollment_system.search_courses(open_only=True, page_size=len(self.enrollment_system.courses))
         
-        # Filter out full courses and already enrolled courses
-        available_courses = [c for c in courses if not c.is_full() and c.course_id not in self.current_student.registered_courses]
+        # Filter out already enrolled courses
+        available_courses = [c for c in open_courses if c.course_id not in self.current_student.registered_courses]
         
         if not available_courses:
-            print("No available courses to enroll in.")
-            print("Reasons might include:")
-            print("- You're already enrolled in all available courses")
-            print("- All courses are full")
-            print("- You've reached your credit limit")
+            self.renderer.write(header +
+                                "No available courses to enroll in.\n"
+                                "Reasons might include:\n"
+                                "- You're already enrolled in all available courses\n"
+                                "- All courses are full\n"
+                                "- You've reached your credit limit\n")
             input("Press Enter to continue...")
             return
         
         total_credits = self.current_student.get_total_credits(self.enrollment_system.courses)
-        print(f"Current Credits: {total_credits}/{self.enrollment_system.max_credits}")
-        print(f"Available Credits: {self.enrollment_system.max_credits - total_credits}")
-        print("Available Courses:")
-        print("-" * 50)
-        for i, course in enumerate(available_courses):
-            print(f"{i+1}. {course.course_id}: {course.name} ({course.department})")
-            days_str = ", ".join(course.days)
-            time_str = f"{course.start_time.strftime('%H:%M')} - {course.end_time.strftime('%H:%M')}" if course.start_time and course.end_time else "N/A"
-            print(f"   Schedule: {days_str} {time_str}")
-            print(f"   Credits: {course.credits}")
-            print(f"   Instructor: {course.instructor}")
-            print(f"   Enrollment: {len(course.enrolled_students)}/{course.max_students}")
-            print("-" * 50)
+        pages = self._page_count(available_courses)
+        page = 0
+        show_page = True
             
         while True:
+            if show_page:
+                parts = [header,
+                         f"Current Credits: {total_credits}/{self.enrollment_system.max_credits}\n",
+                         f"Available Credits: {self.enrollment_system.max_credits - total_credits}\n",
+                         "Available Courses:\n",
+                         "-" * 50 + "\n"]
+                first = page * self.renderer.page_size
+                for i, course in enumerate(self._page_items(available_courses, page), start=first):
+                    parts.append(f"{i+1}. ")
+                    parts.append(self.renderer.block("enroll", course))
+                    parts.append(f"   Enrollment: {course.enrolled_count}/{course.max_students}\n" + "-" * 50 + "\n")
+                if pages > 1:
+                    parts.append(f"Page {page + 1}/{pages} (n = next page, p = previous page)\n")
+                self.renderer.write("".join(parts))
+                show_page = False
+            
             try:
-                choice = int(input(f"Enter course number (1-{len(available_courses)}) or 0 to cancel: "))
+                entry = input(f"Enter course number (1-{len(available_courses)}) or 0 to cancel: ").strip().lower()
+                if entry in ('n', 'p') and pages > 1:
+                    page = min(page + 1, pages - 1) if entry == 'n' else max(page - 1, 0)
+                    self._clear_screen()
+                    show_page = True
+                    continue
+                choice = int(entry)
         
                 if choice == 0:
                     return
@@ -716,16 +2744,13 @@ class UniversitySystem:
                     selected_course = available_courses[choice - 1]
                     print(f"\nYou selected: {selected_course.course_id}: {selected_course.name}")
 
-                    conflicts = []
-                    for enrolled_course_id in self.current_student.registered_courses:
-                        enrolled_course = self.enrollment_system.courses.get(enrolled_course_id)
-                        if enrolled_course and selected_course.has_time_conflict(enrolled_course):
-                            conflicts.append(enrolled_course)
+                    conflicts = self.current_student.get_conflicting_courses(
+                        selected_course, self.enrollment_system.courses)
                 
                     if conflicts:
                         print("Conflict detected with the following courses:")
                         for conflict in conflicts:
-                            print(f"  {conflict.course_id}: {conflict.name} on {', '.join(conflict.days)} {conflict.start_time.strftime('%H:%M')} - {conflict.end_time.strftime('%H:%M')}")
+                            print(f"  {conflict.course_id}: {conflict.name} on {conflict.schedule_str()}")
                         print("Please choose another course or adjust your schedule to resolve the conflict.")
                         input("Press Enter to continue...")
                         return   
@@ -762,28 +2787,26 @@ class UniversitySystem:
     def drop_a_course(self):
         """Allow the student to drop a course"""
         self._clear_screen()
-        print("=" * 50)
-        print("                  DROP COURSE                      ")
-        print("=" * 50)
+        parts = ["=" * 50 + "\n",
+                 "                  DROP COURSE                      \n",
+                 "=" * 50 + "\n"]
         
         # Get student's courses
         courses = self.enrollment_system.get_student_courses(self.current_student.student_id)
         
         if not courses:
-            print("You are not enrolled in any courses.")
+            parts.append("You are not enrolled in any courses.\n")
+            self.renderer.write("".join(parts))
             input("Press Enter to continue...")
             return
         
-        print("Your Courses:")
-        print("-" * 50)
+        parts.append("Your Courses:\n")
+        parts.append("-" * 50 + "\n")
         for i, course in enumerate(courses):
-            print(f"{i+1}. {course.course_id}: {course.name} ({course.department})")
-            days_str = ", ".join(course.days)
-            time_str = f"{course.start_time.strftime('%H:%M')} - {course.end_time.strftime('%H:%M')}" if course.start_time and course.end_time else "N/A"
-            print(f"   Schedule: {days_str} {time_str}")
-            print(f"   Credits: {course.credits}")
-            print(f"   Instructor: {course.instructor}")
-            print("-" * 50)
+            parts.append(f"{i+1}. ")
+            parts.append(self.renderer.block("enroll", course))
+            parts.append("-" * 50 + "\n")
+        self.renderer.write("".join(parts))
         
         try:
             choice = int(input(f"Enter course number to drop (1-{len(courses)}) or 0 to cancel: "))
@@ -814,6 +2837,50 @@ class UniversitySystem:
         
         input("Press Enter to continue...")
     
+    def join_a_waitlist(self):
+        """Put the student on the waitlist of a full course"""
+        self._clear_screen()
+        print("=" * 50)
+        print("                 COURSE WAITLIST                   ")
+        print("=" * 50)
+        
+        student_id = self.current_student.student_id
+        full_courses = [c for c in self.enrollment_system.get_available_courses()
+                        if c.is_full() and c.course_id not in self.current_student.registered_courses]
+        
+        if not full_courses:
+            print("There are no full courses to wait for. Enroll directly instead.")
+            input("Press Enter to continue...")
+            return
+        
+        print("Full Courses:")
+        print("-" * 50)
+        for i, course in enumerate(full_courses):
+            position = self.enrollment_system.get_waitlist_position(student_id, course.course_id)
+            waitlist = self.enrollment_system.waitlists.get(course.course_id)
+            print(f"{i+1}. {course.course_id}: {course.name} ({course.department})")
+            print(f"   Waitlisted: {len(waitlist) if waitlist else 0}")
+            if position:
+                print(f"   Your position: {position}")
+            print("-" * 50)
+        
+        try:
+            choice = int(input(f"Enter course number to join its waitlist (1-{len(full_courses)}) or 0 to cancel: "))
+            
+            if choice == 0:
+                return
+            
+            if 1 <= choice <= len(full_courses):
+                selected_course = full_courses[choice - 1]
+                success, message = self.enrollment_system.join_waitlist(student_id, selected_course.course_id)
+                print(message)
+            else:
+                print(f"Invalid selection. Please enter a number between 1 and {len(full_courses)}.")
+        except ValueError:
+            print("Invalid input. Please enter a valid number or 0 to cancel.")
+        
+        input("Press Enter to continue...")
+    
     def _clear_screen(self):
         """Clear the console screen"""
         # For Windows
@@ -824,6 +2891,96 @@ class UniversitySystem:
             os.system('clear')
 
 
+def read_enrollment_requests(path):
+    """Read (student_id, course_id) pairs from a CSV file with StudentID and CourseID columns"""
+    with open(path, newline='', encoding='utf-8') as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            student_id = row.get('student_id') or row.get('StudentID')
+            course_id = row.get('course_id') or row.get('CourseID')
+            if student_id and course_id:
+                yield student_id.strip(), course_id.strip()
+
+
+def run_batch_file(enrollment_system, path, drop=False, results_path=None):
+    """Enroll (or drop) every pair listed in a request CSV and report the outcome of each row"""
+    requests = list(read_enrollment_requests(path))
+    if drop:
+        results = enrollment_system.drop_many(requests)
+    else:
+        results = enrollment_system.enroll_many(requests)
+    enrollment_system.compact_if_due()
+
+    succeeded = sum(1 for result in results if result[2])
+    for student_id, course_id, success, message in results:
+        print(f"{student_id},{course_id},{'OK' if success else 'FAILED'},{message}")
+    print(f"{succeeded}/{len(results)} requests succeeded")
+
+    if results_path:
+        with open(results_path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(["StudentID", "CourseID", "Success", "Message"])
+            writer.writerows(results)
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Zed University Registration System")
+    parser.add_argument("--storage", choices=["csv", "sqlite"], default="csv",
+                        help="Storage backend (default: csv)")
+    parser.add_argument("--db", default=os.path.join("data", "registration.db"),
+                        help="SQLite database path when --storage sqlite is used")
+    parser.add_argument("--export-csv", action="store_true",
+                        help="Write the current data out as CSV files in data/ and exit")
+    parser.add_argument("--enroll-file", metavar="CSV",
+                        help="Enroll every StudentID,CourseID pair in a request CSV and exit")
+    parser.add_argument("--drop-file", metavar="CSV",
+                        help="Drop every StudentID,CourseID pair in a request CSV and exit")
+    parser.add_argument("--results", metavar="CSV",
+                        help="Where to write per-row results for --enroll-file/--drop-file")
+    parser.add_argument("--debug", action="store_true",
+                        help="Verify cached credit totals and seat counts on every change")
+    parser.add_argument("--page-size", type=int, default=10,
+                        help="Courses per page in course listings (default: 10)")
+    parser.add_argument("--lazy", action="store_true",
+                        help="Load only the course catalog and fetch students on demand (needs --storage sqlite)")
+    parser.add_argument("--shared", action="store_true",
+                        help="Coordinate with other processes using the same data directory (CSV storage)")
+    parser.add_argument("--events", action="store_true",
+                        help="Append every enroll/drop/register/course update to data/events.log")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Record operation latencies and I/O counters to a Prometheus text file")
+    parser.add_argument("--metrics-interval", type=float, default=10.0,
+                        help="Seconds between metrics file updates (default: 10)")
+    args = parser.parse_args()
+    if args.lazy and args.storage != "sqlite":
+        parser.error("--lazy requires --storage sqlite")
+    if args.shared and args.storage != "csv":
+        parser.error("--shared applies to --storage csv; SQLite handles its own locking")
+    return args
+
+
 if __name__ == "__main__":
-    university_system = UniversitySystem()
-    university_system.main_menu()
\ No newline at end of file
+    args = parse_args()
+    storage = None
+    if args.storage == "sqlite":
+        os.makedirs(os.path.dirname(args.db) or ".", exist_ok=True)
+        storage = SQLiteStorage(args.db)
+    metrics = Metrics(args.metrics, args.metrics_interval) if args.metrics else None
+
+    if args.export_csv:
+        EnrollmentSystem(storage, args.debug, metrics=metrics, shared=args.shared).save_data()
+        print("Data exported to CSV.")
+    elif args.enroll_file or args.drop_file:
+        enrollment_system = EnrollmentSystem(storage, args.debug, metrics=metrics, lazy=args.lazy,
+                                             log_events=args.events, shared=args.shared)
+        if args.drop_file:
+            run_batch_file(enrollment_system, args.drop_file, drop=True, results_path=args.results)
+        if args.enroll_file:
+            run_batch_file(enrollment_system, args.enroll_file, results_path=args.results)
+    else:
+        university_system = UniversitySystem(storage, args.debug, args.page_size, metrics, args.lazy, args.events,
+                                             args.shared)
+        university_system.main_menu()
+    if metrics is not None:
+        metrics.flush()
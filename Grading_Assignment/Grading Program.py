@@ -1,42 +1,114 @@
-students = []
-grades = []
-category = []
-
-Max_students = 10
-
-while len(students) < Max_students:
-    s = input('Enter name(input "cancel" to quit): ')
-    if s.lower() == "cancel":
-        break
-    if not s:
-        print("Name cannot be empty.")
-        continue
-    
-    try:
-        g = int(input('Enter grade: '))
-        if 0 <= g <= 100:
-            students.append(s)
-            grades.append(g)
-        else:
-            print("Grade must be between 0 and 100.")
-    except ValueError:
-        print(" Invalid input")
-
-for i in range(len(grades)):
-    if grades[i] >= 90:
-        category.append('Excellent')
-    elif grades[i] >= 80:
-        category.append('Good')
-    elif grades[i] >= 70:
-        category.append('Average')
-    else:
-        category.append('Needs Improvement')
+import argparse
+import sys
+
+from dedupe import DuplicateScreen
+from grade_stats import ScoreCollector, class_stats, parse_bands, render_stats
+from gradebook import Gradebook
+from grading import BANDS, category_for, grade_files
+from sections import grade_sections, render_sections
+from table_writer import FORMATS, TextWriter, parse_widths
+
+
+def interactive(bands=BANDS, stats=False, gradebook=None):
+    students = []
+    grades = []
+    category = []
+
+    Max_students = 10
+
+    while len(students) < Max_students:
+        s = input('Enter name(input "cancel" to quit): ')
+        if s.lower() == "cancel":
+            break
+        if not s:
+            print("Name cannot be empty.")
+            continue
+        
+        try:
+            g = int(input('Enter grade: '))
+            if 0 <= g <= 100:
+                students.append(s)
+                grades.append(g)
+                if gradebook is not None:
+                    gradebook.set_grade(s, g)
+                    gradebook.commit()
+            else:
+                print("Grade must be between 0 and 100.")
+        except ValueError:
+            print(" Invalid input")
 
-data = [["Name", "Grade", "Category"]]
-for i in range(len(students)):
-    data.append([students[i], grades[i], category[i]])
+    for i in range(len(grades)):
+        category.append(category_for(grades[i], bands))
 
-col_widths = [max(len(str(row[i])) for row in data) for i in range(len(data[0]))]
+    with TextWriter(sys.stdout, ["Name", "Grade", "Category"], sample_size=Max_students) as table:
+        for i in range(len(students)):
+            table.write([students[i], grades[i], category[i]])
 
-for row in data:
-    print("  ".join(str(cell).ljust(col_widths[i]) for i, cell in enumerate(row)))
+    if stats:
+        print()
+        print(render_stats(class_stats(grades, bands)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Grade students interactively, or in batch from CSV files")
+    parser.add_argument("inputs", nargs="*", metavar="CSV",
+                        help="Name,Grade CSV files to grade in batch ('-' for stdin); none for interactive mode")
+    parser.add_argument("--batch", action="store_true", help="Batch mode reading stdin when no files are given")
+    parser.add_argument("-o", "--output", help="Where to write Name,Grade,Category rows (default: stdout)")
+    parser.add_argument("--format", choices=FORMATS, default="csv", help="Batch output format (default: csv)")
+    parser.add_argument("--widths", metavar="SPEC",
+                        help='Fixed text column widths, e.g. "Name=24,Grade=6,Category=18"; without it the '
+                             'widths come from the first 1000 rows')
+    parser.add_argument("--rejects", default="rejects.csv", help="Where invalid rows go (default: rejects.csv)")
+    parser.add_argument("--bands", type=parse_bands, default=BANDS,
+                        help='Category cutoffs, e.g. "90:Excellent,80:Good,70:Average,0:Needs Improvement"')
+    parser.add_argument("--stats", action="store_true",
+                        help="Print class statistics (mean, median, stdev, percentiles, categories, histogram)")
+    parser.add_argument("--duplicates", choices=["flag", "merge", "merge-near"],
+                        help="Look for repeated students in batch input: flag them, merge exact repeats "
+                             "(first row wins) or merge near-identical names too")
+    parser.add_argument("--duplicates-report", default="duplicates.csv",
+                        help="Where --duplicates lists what it found (default: duplicates.csv)")
+    parser.add_argument("--gradebook", metavar="DIR",
+                        help="Also record every graded student in the persistent gradebook in DIR")
+    parser.add_argument("--sections", metavar="DIR",
+                        help="Treat each input file as a section: grade them in parallel into DIR and print "
+                             "per-section and overall reports")
+    parser.add_argument("--jobs", type=int, help="Worker processes for --sections (default: one per CPU)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    gradebook = Gradebook(args.gradebook, args.bands) if args.gradebook else None
+    if gradebook is not None:
+        gradebook.autocommit = False  # The pipeline stage commits in batches
+    if args.sections:
+        if not args.inputs:
+            raise SystemExit("--sections needs at least one section file")
+        report, total = render_sections(grade_sections(args.inputs, args.sections, args.bands, args.jobs), args.bands)
+        print(report)
+        if args.stats:
+            print()
+            print(render_stats(total.stats()))
+    elif args.inputs or args.batch:
+        out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+        try:
+            collector = ScoreCollector() if args.stats else None
+            stages = [stage for stage in (collector, gradebook) if stage is not None]
+            widths = parse_widths(args.widths, ["Name", "Grade", "Category"]) if args.widths else None
+            screen = DuplicateScreen(args.duplicates, args.duplicates_report) if args.duplicates else None
+            graded, rejected = grade_files(args.inputs or ["-"], out, args.rejects, args.bands, stages,
+                                           args.format, widths, screen)
+        finally:
+            if args.output:
+                out.close()
+        print(f"Graded {graded} students, rejected {rejected}" + (f" (see {args.rejects})" if rejected else ""),
+              file=sys.stderr)
+        if screen and screen.exact + screen.near:
+            print(f"Found {screen.exact} exact and {screen.near} near duplicates, merged {screen.merged}"
+                  f" (see {args.duplicates_report})", file=sys.stderr)
+        if collector:
+            print(render_stats(class_stats(collector.scores, args.bands)), file=sys.stderr)
+    else:
+        interactive(args.bands, args.stats, gradebook)
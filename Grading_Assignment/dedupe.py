@@ -0,0 +1,183 @@
+import csv
+import re
+import unicodedata
+from functools import lru_cache
+
+from grading import check_grade
+
+DIGITS = re.compile(r"[0-9]+")
+SOUNDEX_CODES = {letter: str(code) for code, letters in enumerate(
+    ["aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r"]) for letter in letters}
+
+
+def normalize(name):
+    """Comparison key for a name: accents, case, punctuation and word order removed.
+
+    "Smith, José" and "jose  SMITH" both become "jose smith". Letters of other scripts are
+    kept as they are after casefolding, so "Иван Петров" becomes "иван петров" rather than
+    an empty key that is never compared.
+    """
+    text = name.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", name)
+        text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    # Letters and digits of any script; for ASCII text this is [a-z0-9]
+    return " ".join(sorted(re.findall(r"[^\W_]+", text)))
+
+
+@lru_cache(maxsize=65536)  # Imports repeat the same first and last names many times over
+def soundex(word):
+    """Four-character Soundex code, so "Smith" and "Smyth" share S530"""
+    if not word:
+        return ""
+    code = word[0].upper()
+    previous = SOUNDEX_CODES.get(word[0], "")
+    for char in word[1:]:
+        digit = SOUNDEX_CODES.get(char, "")
+        if digit and digit != "0" and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        if char not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def blocking_keys(key):
+    """Blocks a normalized name is filed under; only names sharing a block are ever compared.
+
+    One block is phonetic (the Soundex of every word) and catches spelling variants, the other
+    is the first three letters of every word and catches typos later in the words.
+    """
+    words = key.split()
+    return ("p:" + " ".join(soundex(word) for word in words), "n:" + " ".join(word[:3] for word in words))
+
+
+def within_distance(a, b, limit):
+    """Whether the edit distance between a and b is at most limit.
+
+    Only the diagonal band of width 2 * limit + 1 of the edit table is filled, and the search
+    stops as soon as a whole row is over the limit, so the cost is O(limit * len(a)).
+    """
+    if abs(len(a) - len(b)) > limit:
+        return False
+    if a == b:
+        return True
+    over = limit + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        char = a[i - 1]
+        best = current[0]
+        for j in range(low, high + 1):
+            value = previous[j - 1] if char == b[j - 1] else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return False
+        previous = current
+    return previous[len(b)] <= limit
+
+
+class DuplicateScreen:
+    """Finds repeated students as records stream in, before they are validated and graded.
+
+    Exact duplicates (the same normalized name) are found with one hash lookup. Near duplicates
+    are only looked for among earlier names sharing a blocking key, and only the latest
+    max_block names of each block are kept, so no record is compared with more than
+    2 * max_block earlier names. The cost per record still rises until the busiest blocks are
+    full, so time grows somewhat faster than the row count on small and medium imports and
+    linearly after that; memory grows with the number of distinct names.
+
+    mode "flag" keeps every record and lists the duplicates in the report; "merge" keeps the
+    first record for each exact name and drops the rest; "merge-near" also drops near
+    duplicates. Dropped records are counted in merged and listed in the report, not rejected.
+    """
+
+    def __init__(self, mode="flag", report_path=None, max_distance=2, max_block=20):
+        self.mode = mode
+        self.report_path = report_path
+        self.max_distance = max_distance
+        self.max_block = max_block
+        self.seen = {}  # normalized name -> (name, source, line_number) of its first record
+        self.blocks = {}  # blocking key -> [normalized name, ...], newest last
+        self.exact = 0
+        self.near = 0
+        self.merged = 0
+        self._file = None
+        self._writer = None
+
+    def match(self, key, block_keys):
+        """First record of the same student, and whether the match is exact, or (None, False)"""
+        if key in self.seen:
+            return self.seen[key], True
+        # One edit per five characters, so short names like "ann lee" and "amy lee" stay apart
+        limit = min(self.max_distance, len(key) // 5)
+        if not limit:
+            return None, False
+        digits = DIGITS.findall(key)
+        for block_key in block_keys:
+            for candidate in reversed(self.blocks.get(block_key, ())):
+                # Numbers in a name are usually IDs or suffixes, so they have to match exactly
+                if DIGITS.findall(candidate) == digits and within_distance(key, candidate, limit):
+                    return self.seen[candidate], False
+        return None, False
+
+    def add(self, key, block_keys, name, source, line_number):
+        self.seen[key] = (name, source, line_number)
+        for block_key in block_keys:
+            block = self.blocks.setdefault(block_key, [])
+            block.append(key)
+            if len(block) > self.max_block:
+                del block[0]
+
+    def _report(self, source, line_number, name, first, kind, action):
+        if self.report_path is None:
+            return
+        if self._writer is None:
+            self._file = open(self.report_path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["Source", "Line", "Name", "Kind", "FirstName", "FirstSource", "FirstLine",
+                                   "Action"])
+        self._writer.writerow([source, line_number, name, kind, *first, action])
+
+    def __call__(self, records):
+        """Pipeline stage over parse() output that drops the duplicates it merges"""
+        try:
+            for source, line_number, name, grade_text in records:
+                if check_grade(name, grade_text)[1]:
+                    yield source, line_number, name, grade_text  # validate() will reject it
+                    continue
+                key = normalize(name)
+                if not key:
+                    yield source, line_number, name, grade_text
+                    continue
+                block_keys = blocking_keys(key)
+                first, exact = self.match(key, block_keys)
+                if first is None:
+                    self.add(key, block_keys, name, source, line_number)
+                    yield source, line_number, name, grade_text
+                    continue
+                kind = "exact" if exact else "near"
+                if exact:
+                    self.exact += 1
+                else:
+                    self.near += 1
+                drop = self.mode == "merge-near" or (self.mode == "merge" and exact)
+                self._report(source, line_number, name, first, kind, "merged" if drop else "kept")
+                if drop:
+                    self.merged += 1
+                    continue
+                if not exact:
+                    self.add(key, block_keys, name, source, line_number)
+                yield source, line_number, name, grade_text
+        finally:
+            if self._file is not None:
+                self._file.close()
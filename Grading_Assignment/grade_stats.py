@@ -0,0 +1,229 @@
+import bisect
+import math
+from array import array
+
+from grading import BANDS
+
+try:
+    import numpy as np
+except ImportError:  # The pure-Python path gives the same results, just more slowly
+    np = None
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def parse_bands(text):
+    """Parse bands written as "90:Excellent,80:Good,70:Average,0:Needs Improvement" """
+    bands = []
+    for part in text.split(","):
+        cutoff, _, name = part.partition(":")
+        if not name.strip():
+            raise ValueError(f"Band {part!r} should look like 90:Excellent")
+        bands.append((float(cutoff), name.strip()))
+    bands.sort(key=lambda band: -band[0])
+    return bands
+
+
+def as_scores(scores):
+    """Scores as a float64 array (NumPy) or a list of floats"""
+    if np is not None:
+        return np.asarray(scores, dtype=np.float64)
+    return [float(score) for score in scores]
+
+
+def band_indices(scores, bands=BANDS):
+    """Index into bands of each score's category, for a whole array of scores at once.
+
+    Scores below the lowest cutoff fall into the last band, like category_for.
+    """
+    cutoffs = [cutoff for cutoff, _ in reversed(bands)]  # Ascending
+    last = len(bands) - 1
+    if np is not None:
+        below = np.searchsorted(np.asarray(cutoffs, dtype=np.float64), as_scores(scores), side="right")
+        return np.clip(last - (below - 1), 0, last)
+    return [min(last - (bisect.bisect_right(cutoffs, score) - 1), last) for score in scores]
+
+
+def categorize_scores(scores, bands=BANDS):
+    """Category name of every score"""
+    names = [name for _, name in bands]
+    indices = band_indices(scores, bands)
+    if np is not None:
+        return np.asarray(names, dtype=object)[indices]
+    return [names[index] for index in indices]
+
+
+def _percentile(ordered, count, p):
+    # Linear interpolation between closest ranks, the same rule as numpy.percentile
+    position = (count - 1) * p / 100
+    low = math.floor(position)
+    high = min(low + 1, count - 1)
+    return float(ordered[low] + (ordered[high] - ordered[low]) * (position - low))
+
+
+def class_stats(scores, bands=BANDS, percentiles=PERCENTILES, bins=10, low=0, high=100):
+    """Count, mean, median, stdev, min, max, percentiles, band counts and histogram of the scores.
+
+    The scores are sorted once and everything else is read off the sorted array: percentiles by
+    position, and band counts and histogram bins by binary search for their edges, so the cost
+    beyond the sort is O(bands + bins) whatever the class size. stdev is the sample standard
+    deviation, as in statistics.stdev.
+    """
+    ordered = np.sort(as_scores(scores)) if np is not None else sorted(as_scores(scores))
+    count = len(ordered)
+    stats = {"count": count, "mean": None, "median": None, "stdev": None, "min": None, "max": None,
+             "percentiles": {}, "bands": {name: 0 for _, name in bands}, "histogram": []}
+    width = (high - low) / bins
+    edges = [low + i * width for i in range(bins)] + [high]
+    if count == 0:
+        stats["histogram"] = [(edges[i], edges[i + 1], 0) for i in range(bins)]
+        return stats
+
+    if np is not None:
+        mean = float(ordered.mean())
+        stdev = float(ordered.std(ddof=1)) if count > 1 else 0.0
+        search = lambda value, side: int(np.searchsorted(ordered, value, side=side))
+    else:
+        mean = math.fsum(ordered) / count
+        stdev = math.sqrt(math.fsum((score - mean) ** 2 for score in ordered) / (count - 1)) if count > 1 else 0.0
+        search = lambda value, side: (bisect.bisect_left if side == "left" else bisect.bisect_right)(ordered, value)
+
+    stats.update(mean=mean, stdev=stdev, median=_percentile(ordered, count, 50),
+                 min=float(ordered[0]), max=float(ordered[-1]))
+    stats["percentiles"] = {p: _percentile(ordered, count, p) for p in percentiles}
+
+    # A band holds the scores from its cutoff up to the next band's cutoff; the last band also
+    # takes anything below its own cutoff
+    upper = count
+    for index, (cutoff, name) in enumerate(bands):
+        start = search(cutoff, "left") if index < len(bands) - 1 else 0
+        stats["bands"][name] += upper - start
+        upper = start
+
+    # Bins are [edge, next edge) except the last, which includes the high end like numpy.histogram
+    positions = [search(edge, "left") for edge in edges[:-1]] + [search(high, "right")]
+    stats["histogram"] = [(edges[i], edges[i + 1], positions[i + 1] - positions[i]) for i in range(bins)]
+    return stats
+
+
+def render_stats(stats, bar_width=40):
+    """Text report of class_stats output"""
+    if not stats["count"]:
+        return "No grades"
+    lines = [f"Students: {stats['count']}",
+             f"Mean: {stats['mean']:.2f}  Median: {stats['median']:.2f}  Stdev: {stats['stdev']:.2f}  "
+             f"Min: {stats['min']:g}  Max: {stats['max']:g}",
+             "Percentiles: " + "  ".join(f"p{p:g}={value:.2f}" for p, value in stats["percentiles"].items()),
+             "Categories:"]
+    for name, band_count in stats["bands"].items():
+        lines.append(f"  {name:20s} {band_count:8d} {band_count / stats['count']:7.1%}")
+    lines.append("Histogram:")
+    tallest = max(band_count for _, _, band_count in stats["histogram"]) or 1
+    for start, end, band_count in stats["histogram"]:
+        lines.append(f"  {start:5g}-{end:<5g} {band_count:8d} {'#' * round(bar_width * band_count / tallest)}")
+    return "\n".join(lines)
+
+
+class GradeSummary:
+    """Mergeable summary of a set of grades: what a worker sends back instead of the grades.
+
+    Mean and variance are kept as count, mean and sum of squared deviations and combined with
+    Chan's parallel formula. Percentiles come from a sketch counting grades rounded to
+    1/SKETCH_SCALE of a point, which is exact for grades with at most one decimal place and
+    never holds more than 100 * SKETCH_SCALE + 1 entries however many grades it has seen.
+    """
+
+    SKETCH_SCALE = 10
+
+    def __init__(self, bands=BANDS):
+        self.bands = bands
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.band_counts = [0] * len(bands)
+        self.sketch = {}  # round(grade * SKETCH_SCALE) -> how many grades
+
+    def add(self, grade):
+        self.count += 1
+        delta = grade - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (grade - self.mean)
+        self.min = grade if self.min is None else min(self.min, grade)
+        self.max = grade if self.max is None else max(self.max, grade)
+        for index, (cutoff, _) in enumerate(self.bands):
+            if grade >= cutoff:
+                break
+        self.band_counts[index] += 1
+        key = round(grade * self.SKETCH_SCALE)
+        self.sketch[key] = self.sketch.get(key, 0) + 1
+
+    def __call__(self, records):
+        """Pipeline stage that passes (name, grade, ...) records through, adding each grade"""
+        for record in records:
+            self.add(record[1])
+            yield record
+
+    def merge(self, other):
+        """Fold another summary (with the same bands) into this one"""
+        if not other.count:
+            return self
+        if not self.count:
+            self.mean, self.m2, self.min, self.max = other.mean, other.m2, other.min, other.max
+        else:
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta * delta * self.count * other.count / count
+            self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self.count += other.count
+        self.band_counts = [mine + theirs for mine, theirs in zip(self.band_counts, other.band_counts)]
+        for key, key_count in other.sketch.items():
+            self.sketch[key] = self.sketch.get(key, 0) + key_count
+        return self
+
+    def stats(self, percentiles=PERCENTILES, bins=10, low=0, high=100):
+        """The same dict as class_stats, with percentiles and histogram read from the sketch"""
+        stats = {"count": self.count, "mean": None, "median": None, "stdev": None, "min": self.min,
+                 "max": self.max, "percentiles": {},
+                 "bands": {name: band_count for (_, name), band_count in zip(self.bands, self.band_counts)}}
+        keys = sorted(self.sketch)
+        ends = []  # ends[i] = how many grades are at or below keys[i]
+        total = 0
+        for key in keys:
+            total += self.sketch[key]
+            ends.append(total)
+
+        def value_at(rank):
+            return keys[bisect.bisect_right(ends, rank)] / self.SKETCH_SCALE
+
+        def percentile(p):
+            position = (self.count - 1) * p / 100
+            rank = math.floor(position)
+            below, above = value_at(rank), value_at(min(rank + 1, self.count - 1))
+            return below + (above - below) * (position - rank)
+
+        width = (high - low) / bins
+        edges = [low + i * width for i in range(bins)] + [high]
+        histogram = [0] * bins
+        for key, key_count in self.sketch.items():
+            histogram[min(max(int((key / self.SKETCH_SCALE - low) // width), 0), bins - 1)] += key_count
+        stats["histogram"] = [(edges[i], edges[i + 1], histogram[i]) for i in range(bins)]
+        if self.count:
+            stats.update(mean=self.mean, stdev=math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0,
+                         median=percentile(50))
+            stats["percentiles"] = {p: percentile(p) for p in percentiles}
+        return stats
+
+
+class ScoreCollector:
+    """Pipeline stage that passes (name, grade, ...) records through and keeps the grades compactly"""
+
+    def __init__(self):
+        self.scores = array('d')
+
+    def __call__(self, records):
+        for record in records:
+            self.scores.append(record[1])
+            yield record
@@ -0,0 +1,365 @@
+import argparse
+import csv
+import math
+import os
+
+from grade_stats import parse_bands
+from grading import BANDS
+
+
+def _format(grade):
+    return str(int(grade)) if grade.is_integer() else repr(grade)
+
+
+class FenwickTree:
+    """Counts per slot with O(log n) update, prefix sum and k-th element search"""
+
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    @classmethod
+    def from_counts(cls, counts):
+        """Build from a list of slot counts in O(n)"""
+        fenwick = cls(len(counts))
+        tree = fenwick.tree
+        for i, count in enumerate(counts, 1):
+            tree[i] += count
+            parent = i + (i & -i)
+            if parent <= fenwick.size:
+                tree[parent] += tree[i]
+        return fenwick
+
+    def add(self, slot, delta):
+        i = slot + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, slot):
+        """Total of slots 0..slot"""
+        total = 0
+        i = min(slot + 1, self.size)
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, k):
+        """Smallest slot whose prefix total reaches k (1-based)"""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            following = position + step
+            if following <= self.size and self.tree[following] < k:
+                position = following
+                k -= self.tree[following]
+            step >>= 1
+        return position
+
+
+class Gradebook:
+    """Grades that persist between runs, with running statistics and rank queries.
+
+    Grades live in gradebook.csv plus an append-only journal of changes, folded into the CSV
+    once it holds compact_threshold records and more than the CSV does. In memory, mean and
+    variance are kept with Welford's method (updated in O(1) when a grade is added, changed or
+    removed), band counts are kept per band, and a Fenwick tree counts grades per 1/SCALE of a
+    point. Grades are rounded to that resolution as they come in, so a grade's band and its tree
+    slot always agree. Rank, top-k and percentile queries and band counts for new cutoffs or a
+    curve are O(log) lookups on that tree, so the class is never re-sorted or rescanned.
+    """
+
+    SCALE = 10  # Slots per grade point; grades are stored to this resolution
+    SLOTS = 100 * SCALE + 1
+
+    def __init__(self, data_dir="gradebook", bands=BANDS, compact_threshold=1000):
+        self.data_dir = data_dir
+        self.bands = bands
+        self.compact_threshold = compact_threshold
+        self.autocommit = True
+        self.grades = {}  # name -> grade
+        self.slots = {}  # slot -> set of names with a grade in it
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.band_counts = [0] * len(bands)
+        self._journal_buffer = []
+        self._journal_records = 0
+        os.makedirs(data_dir, exist_ok=True)
+        self.load()
+
+    def _path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def _slot(self, grade):
+        return round(grade * self.SCALE)
+
+    def _quantize(self, grade):
+        return self._slot(grade) / self.SCALE
+
+    def _band(self, grade, bands=None):
+        bands = bands or self.bands
+        for index, (cutoff, _) in enumerate(bands):
+            if grade >= cutoff:
+                return index
+        return len(bands) - 1
+
+    def load(self):
+        """Read the snapshot and journal, then build the statistics in one linear pass"""
+        grades = {}
+        if os.path.exists(self._path("gradebook.csv")):
+            with open(self._path("gradebook.csv"), newline='', encoding='utf-8') as file:
+                reader = csv.reader(file)
+                next(reader, None)  # Skip header
+                for row in reader:
+                    if len(row) >= 2:
+                        grades[row[0]] = self._quantize(float(row[1]))
+        if os.path.exists(self._path("gradebook.journal")):
+            with open(self._path("gradebook.journal"), 'rb') as file:
+                data = file.read()
+            # Stop after the last complete line: a crash mid-write can leave a truncated one. Cut it
+            # off the file too, or the next commit would append onto the fragment and be lost with it
+            end = data.rfind(b"\n") + 1
+            if end != len(data):
+                with open(self._path("gradebook.journal"), 'rb+') as file:
+                    file.truncate(end)
+            for row in csv.reader(data[:end].decode('utf-8').splitlines()):
+                if len(row) >= 3 and row[0] == 'S':
+                    grades[row[1]] = self._quantize(float(row[2]))
+                elif len(row) >= 2 and row[0] == 'D':
+                    grades.pop(row[1], None)
+                self._journal_records += 1
+
+        self.grades = {}
+        self.slots = {}
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        self.band_counts = [0] * len(self.bands)
+        counts = [0] * self.SLOTS
+        for name, grade in grades.items():
+            self.grades[name] = grade
+            self.slots.setdefault(self._slot(grade), set()).add(name)
+            counts[self._slot(grade)] += 1
+            self._add_stats(grade)
+        self.tree = FenwickTree.from_counts(counts)
+
+    def _add_stats(self, grade):
+        self.count += 1
+        delta = grade - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (grade - self.mean)
+        self.band_counts[self._band(grade)] += 1
+
+    def _remove_stats(self, grade):
+        self.count -= 1
+        if self.count == 0:
+            self.mean, self.m2 = 0.0, 0.0
+        else:
+            delta = grade - self.mean
+            self.mean -= delta / self.count
+            self.m2 = max(self.m2 - delta * (grade - self.mean), 0.0)
+        self.band_counts[self._band(grade)] -= 1
+
+    def _insert(self, name, grade):
+        self.grades[name] = grade
+        self.slots.setdefault(self._slot(grade), set()).add(name)
+        self.tree.add(self._slot(grade), 1)
+        self._add_stats(grade)
+
+    def _delete(self, name):
+        grade = self.grades.pop(name)
+        slot = self._slot(grade)
+        self.slots[slot].discard(name)
+        if not self.slots[slot]:
+            del self.slots[slot]
+        self.tree.add(slot, -1)
+        self._remove_stats(grade)
+
+    def set_grade(self, name, grade):
+        """Add a student's grade or replace the one on record"""
+        name = name.strip()
+        if not name:
+            return False, "Name cannot be empty"
+        try:
+            grade = float(grade)
+        except (TypeError, ValueError):
+            return False, "Invalid grade"
+        if not 0 <= grade <= 100:
+            return False, "Grade must be between 0 and 100"
+        grade = self._quantize(grade)
+        previous = self.grades.get(name)
+        if previous == grade:
+            return True, f"{name} already has {grade:g}"
+        if previous is not None:
+            self._delete(name)
+        self._insert(name, grade)
+        self._log('S', name, _format(grade))
+        return True, f"{name}: {grade:g}" + (f" (was {previous:g})" if previous is not None else "")
+
+    def remove(self, name):
+        if name not in self.grades:
+            return False, f"No grade for {name}"
+        self._delete(name)
+        self._log('D', name)
+        return True, f"Removed {name}"
+
+    def __call__(self, records):
+        """Pipeline stage that records each (name, grade, ...) passing through"""
+        for record in records:
+            self.set_grade(record[0], record[1])
+            if len(self._journal_buffer) >= 1000:
+                self.commit()
+            yield record
+        self.commit()
+
+    def _log(self, *record):
+        self._journal_buffer.append(record)
+        if self.autocommit:
+            self.commit()
+
+    def commit(self):
+        """Append queued journal records with a single fsync"""
+        if not self._journal_buffer:
+            return
+        with open(self._path("gradebook.journal"), 'a', newline='', encoding='utf-8') as file:
+            csv.writer(file).writerows(self._journal_buffer)
+            file.flush()
+            os.fsync(file.fileno())
+        self._journal_records += len(self._journal_buffer)
+        self._journal_buffer = []
+        # Waiting until the journal outgrows the snapshot keeps big imports from rewriting it over and over
+        if self._journal_records >= max(self.compact_threshold, len(self.grades)):
+            self.compact()
+
+    def compact(self):
+        """Fold the journal into gradebook.csv and start a fresh journal"""
+        self._journal_buffer = []
+        target = self._path("gradebook.csv")
+        with open(target + ".tmp", 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(["Name", "Grade"])
+            writer.writerows([name, _format(grade)] for name, grade in self.grades.items())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(target + ".tmp", target)
+        # Truncate only after the snapshot is on disk; replaying a stale journal is harmless
+        open(self._path("gradebook.journal"), 'w').close()
+        self._journal_records = 0
+
+    def stdev(self):
+        """Sample standard deviation"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def rank(self, name):
+        """1 for the top grade; tied students share a rank"""
+        if name not in self.grades:
+            return None
+        return self.count - self.tree.prefix(self._slot(self.grades[name])) + 1
+
+    def top(self, k):
+        """The k best (name, grade) pairs, best first, names in order within a tie"""
+        result = []
+        remaining = self.count
+        while remaining and len(result) < k:
+            slot = self.tree.find(remaining)
+            names = sorted(self.slots[slot])
+            result.extend((name, self.grades[name]) for name in names[:k - len(result)])
+            remaining -= len(names)
+        return result
+
+    def percentile_of(self, score):
+        """Percentage of the class with a grade at or below score"""
+        if not self.count:
+            return None
+        slot = self._slot(score)
+        at_or_below = self.tree.prefix(slot) if slot >= 0 else 0
+        return 100 * at_or_below / self.count
+
+    def score_at(self, p):
+        """Grade at percentile p, on the same linear-interpolation rule as class_stats"""
+        if not self.count:
+            return None
+        position = (self.count - 1) * p / 100
+        rank = math.floor(position)
+        below = self.tree.find(rank + 1) / self.SCALE
+        above = self.tree.find(min(rank + 2, self.count)) / self.SCALE
+        return below + (above - below) * (position - rank)
+
+    def counts_for(self, bands=None, curve=0):
+        """{band name: students} for other cutoffs or after adding curve points to every grade.
+
+        Read from the Fenwick tree with one prefix sum per band, without touching any grade.
+        """
+        bands = bands or self.bands
+        result = {}
+        upper = self.count
+        for index, (cutoff, name) in enumerate(bands):
+            if index == len(bands) - 1:
+                start = 0
+            else:
+                # Grades at or above cutoff - curve; slots hold whole multiples of 1/SCALE
+                first_slot = math.ceil(round((cutoff - curve) * self.SCALE, 6))
+                start = self.tree.prefix(first_slot - 1) if first_slot > 0 else 0
+            result[name] = upper - start
+            upper = start
+        return result
+
+    def set_bands(self, bands):
+        """Switch to new cutoffs, recomputing the band counts from the tree"""
+        counts = self.counts_for(bands)
+        self.bands = bands
+        self.band_counts = [counts[name] for _, name in bands]
+
+    def stats(self):
+        return {"count": self.count, "mean": self.mean if self.count else None,
+                "stdev": self.stdev() if self.count else None, "median": self.score_at(50),
+                "bands": {name: band_count for (_, name), band_count in zip(self.bands, self.band_counts)}}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Query or update the persistent gradebook")
+    parser.add_argument("--data-dir", default="gradebook")
+    parser.add_argument("--bands", type=parse_bands, default=BANDS,
+                        help='Category cutoffs, e.g. "90:Excellent,80:Good,70:Average,0:Needs Improvement"')
+    parser.add_argument("--set", nargs=2, action="append", default=[], metavar=("NAME", "GRADE"))
+    parser.add_argument("--remove", action="append", default=[], metavar="NAME")
+    parser.add_argument("--rank", action="append", default=[], metavar="NAME")
+    parser.add_argument("--top", type=int, metavar="K")
+    parser.add_argument("--percentile-of", type=float, metavar="SCORE")
+    parser.add_argument("--curve", type=float, default=0, help="Show category counts after adding this many points")
+    parser.add_argument("--compact", action="store_true", help="Fold the journal into gradebook.csv")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    gradebook = Gradebook(args.data_dir, args.bands)
+    gradebook.autocommit = False
+    for name, grade in args.set:
+        print(gradebook.set_grade(name, grade)[1])
+    for name in args.remove:
+        print(gradebook.remove(name)[1])
+    gradebook.commit()
+    if args.compact:
+        gradebook.compact()
+
+    stats = gradebook.stats()
+    if not stats["count"]:
+        print("The gradebook is empty")
+    else:
+        print(f"Students: {stats['count']}  Mean: {stats['mean']:.2f}  Median: {stats['median']:.2f}  "
+              f"Stdev: {stats['stdev']:.2f}")
+        counts = gradebook.counts_for(curve=args.curve) if args.curve else stats["bands"]
+        print("Categories" + (f" with a {args.curve:g} point curve:" if args.curve else ":"))
+        for name, band_count in counts.items():
+            print(f"  {name:20s} {band_count:8d}")
+    for name in args.rank:
+        rank = gradebook.rank(name)
+        print(f"{name}: " + (f"rank {rank} of {gradebook.count} with {gradebook.grades[name]:g}"
+                             if rank else "no grade"))
+    if args.top:
+        for position, (name, grade) in enumerate(gradebook.top(args.top), 1):
+            print(f"{position:4d}. {name}  {grade:g}")
+    if args.percentile_of is not None and gradebook.count:
+        print(f"{gradebook.percentile_of(args.percentile_of):.1f}% of the class scored "
+              f"{args.percentile_of:g} or below")
@@ -0,0 +1,151 @@
+import csv
+import sys
+
+from table_writer import table_writer
+
+# Lowest grade for each category, best first
+BANDS = [(90, "Excellent"), (80, "Good"), (70, "Average"), (0, "Needs Improvement")]
+
+
+def category_for(grade, bands=BANDS):
+    """Category of a single grade"""
+    for cutoff, name in bands:
+        if grade >= cutoff:
+            return name
+    return bands[-1][1]
+
+
+def read_rows(paths):
+    """Yield (source, line_number, row) from each CSV file in turn; '-' reads stdin"""
+    for path in paths:
+        if path == "-":
+            yield from _rows("<stdin>", sys.stdin)
+        else:
+            with open(path, newline='', encoding='utf-8') as file:
+                yield from _rows(path, file)
+
+
+def _rows(source, file):
+    reader = csv.reader(file)
+    for row in reader:
+        yield source, reader.line_num, row
+
+
+def parse(rows):
+    """Turn raw rows into (source, line_number, name, grade_text), skipping blank lines and headers.
+
+    The name and grade columns are found from the first row of each source if it is a header
+    (any columns called name and grade, in any case); otherwise they are the first two columns.
+    """
+    columns = {}
+    for source, line_number, row in rows:
+        if not any(cell.strip() for cell in row):
+            continue
+        if source not in columns:
+            lowered = [cell.strip().lower() for cell in row]
+            if "name" in lowered and "grade" in lowered:
+                columns[source] = (lowered.index("name"), lowered.index("grade"))
+                continue
+            columns.setdefault(source, (0, 1))
+        name_column, grade_column = columns[source]
+        name = row[name_column].strip() if len(row) > name_column else ""
+        grade = row[grade_column].strip() if len(row) > grade_column else ""
+        yield source, line_number, name, grade
+
+
+def check_grade(name, grade_text):
+    """(grade, None) for a valid name and grade, otherwise (None, reason)"""
+    if not name:
+        return None, "Name cannot be empty"
+    try:
+        grade = float(grade_text)
+    except ValueError:
+        return None, "Invalid grade"
+    if not 0 <= grade <= 100:
+        return None, "Grade must be between 0 and 100"
+    return (int(grade) if grade.is_integer() else grade), None
+
+
+def validate(records, reject):
+    """Yield (name, grade) for valid records and pass the rest to reject(source, line, name, grade, reason)"""
+    for source, line_number, name, grade_text in records:
+        grade, reason = check_grade(name, grade_text)
+        if reason:
+            reject(source, line_number, name, grade_text, reason)
+            continue
+        yield name, grade
+
+
+def categorize(records, bands=BANDS, chunk_size=4096):
+    """Yield (name, grade, category).
+
+    With NumPy installed, grades are categorized chunk_size at a time by
+    grade_stats.categorize_scores in one vectorized search per chunk; without it the
+    per-grade loop is faster than collecting chunks, so category_for is used directly.
+    """
+    from grade_stats import categorize_scores, np  # grade_stats imports BANDS from this module
+
+    if np is None:
+        for name, grade in records:
+            yield name, grade, category_for(grade, bands)
+        return
+    names, grades = [], []
+    for name, grade in records:
+        names.append(name)
+        grades.append(grade)
+        if len(grades) >= chunk_size:
+            yield from zip(names, grades, categorize_scores(grades, bands))
+            names, grades = [], []
+    if grades:
+        yield from zip(names, grades, categorize_scores(grades, bands))
+
+
+def emit(records, out, fmt="csv", widths=None):
+    """Write graded records as a Name, Grade, Category table in fmt and return how many were written"""
+    with table_writer(fmt, out, widths=widths) as writer:
+        return writer.write_rows(records)
+
+
+class RejectWriter:
+    """Collects invalid rows in a reject CSV, opened on the first rejection"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def __call__(self, source, line_number, name, grade, reason):
+        if self._writer is None:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["Source", "Line", "Name", "Grade", "Reason"])
+        self._writer.writerow([source, line_number, name, grade, reason])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def grade_files(paths, out, rejects_path, bands=BANDS, stages=(), fmt="csv", widths=None, screen=None):
+    """Run the parse -> validate -> categorize -> emit pipeline over the input files.
+
+    Rows are streamed one at a time, so memory use does not grow with the input. stages are
+    extra generator stages run, in order, on the categorized records before they are written.
+    screen, if given, is a generator stage run on the parsed records before they are
+    validated. fmt and widths choose the output format, as for table_writer.
+    Returns (graded, rejected).
+    """
+    rejects = RejectWriter(rejects_path)
+    try:
+        records = parse(read_rows(paths))
+        if screen is not None:
+            records = screen(records)
+        records = categorize(validate(records, rejects), bands)
+        for stage in stages:
+            records = stage(records)
+        graded = emit(records, out, fmt, widths)
+    finally:
+        rejects.close()
+    return graded, rejects.count
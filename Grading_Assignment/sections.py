@@ -0,0 +1,87 @@
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from grade_stats import GradeSummary
+from grading import BANDS, grade_files
+
+
+def section_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def section_names(paths):
+    """Output name of each section, unique within the run.
+
+    A section is named after its file unless another section has the same file name; then its
+    directory is prefixed, and sections that still look alike are numbered.
+    """
+    names = [section_name(path) for path in paths]
+    repeated = Counter(names)
+    names = [f"{os.path.basename(os.path.dirname(os.path.abspath(path)))}-{name}" if repeated[name] > 1 else name
+             for path, name in zip(paths, names)]
+    repeated = Counter(names)
+    taken = set(names)
+    for index, name in enumerate(names):
+        if repeated[name] > 1:
+            number = index + 1
+            while f"{name}-{number}" in taken:
+                number += len(names)
+            names[index] = f"{name}-{number}"
+            taken.add(names[index])
+    return names
+
+
+def grade_section(path, name, out_dir, bands=BANDS):
+    """Grade one section file into out_dir as name and return (name, graded, rejected, summary).
+
+    Runs in a worker process: the graded rows and rejects are written straight to files there,
+    so only the small GradeSummary travels back to the parent.
+    """
+    summary = GradeSummary(bands)
+    with open(os.path.join(out_dir, name + ".graded.csv"), 'w', newline='', encoding='utf-8') as out:
+        graded, rejected = grade_files([path], out, os.path.join(out_dir, name + ".rejects.csv"), bands,
+                                       [summary])
+    return name, graded, rejected, summary
+
+
+def grade_sections(paths, out_dir, bands=BANDS, jobs=None):
+    """Grade every section file over a process pool and yield each section's result as it finishes.
+
+    Sections are handed out a few at a time, so hundreds of small files do not each pay a
+    round trip to a worker; with jobs=1 everything runs in this process. Each section's
+    files are named by section_names, so sections never overwrite each other's output.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    names = section_names(paths)
+    work = partial(grade_section, out_dir=out_dir, bands=bands)
+    if jobs == 1 or len(paths) <= 1:
+        yield from map(work, paths, names)
+        return
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(work, paths, names, chunksize=max(1, len(paths) // (jobs * 4)))
+
+
+def render_sections(results, bands=BANDS):
+    """One line per section and an institution-wide total built by merging the section summaries"""
+    names = [name for _, name in bands]
+    total = GradeSummary(bands)
+    lines = [f"{'Section':24s} {'Graded':>8s} {'Rejected':>8s} {'Mean':>7s} {'Median':>7s} {'Stdev':>7s}  "
+             + "  ".join(names)]
+    rejected_total = 0
+    for name, graded, rejected, summary in results:
+        stats = summary.stats()
+        rejected_total += rejected
+        total.merge(summary)
+        lines.append(_section_line(name, graded, rejected, stats, names))
+    lines.append(_section_line("All sections", total.count, rejected_total, total.stats(), names))
+    return "\n".join(lines), total
+
+
+def _section_line(name, graded, rejected, stats, names):
+    if not graded:
+        return f"{name:24s} {graded:8d} {rejected:8d}"
+    return (f"{name:24s} {graded:8d} {rejected:8d} {stats['mean']:7.2f} {stats['median']:7.2f} "
+            f"{stats['stdev']:7.2f}  " + "  ".join(f"{stats['bands'][band]:{len(band)}d}" for band in names))
@@ -0,0 +1,138 @@
+import csv
+import io
+import json
+import sys
+from abc import ABC, abstractmethod
+
+FORMATS = ("text", "csv", "jsonl")
+
+
+class TableWriter(ABC):
+    """Writes table rows as they arrive, handing them to the output in batches.
+
+    Nothing is kept but the current batch, so memory use does not depend on the table size,
+    and the first rows appear as soon as the first batch is full instead of after the input ends.
+    """
+
+    def __init__(self, out, columns, batch_size=256):
+        self.out = out
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.count = 0
+        self._lines = []
+
+    def write(self, row):
+        self._lines.append(self.format_row(row))
+        self.count += 1
+        if len(self._lines) >= self.batch_size:
+            self.flush()
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+        return self.count
+
+    def flush(self):
+        if self._lines:
+            self.out.write("".join(self._lines))
+            self._lines = []
+        self.out.flush()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @abstractmethod
+    def format_row(self, row):
+        """The output text for one row, line ending included"""
+
+
+class CsvWriter(TableWriter):
+    def __init__(self, out, columns, batch_size=256):
+        super().__init__(out, columns, batch_size)
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer)
+        self._lines.append(self.format_row(self.columns))
+
+    def format_row(self, row):
+        self._csv.writerow(row)
+        line = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return line
+
+
+class JsonLinesWriter(TableWriter):
+    def format_row(self, row):
+        return json.dumps(dict(zip(self.columns, row))) + "\n"
+
+
+class TextWriter(TableWriter):
+    """Fixed-width columns separated by two spaces.
+
+    Column widths come from widths if given (the declared schema), otherwise from the header
+    and the first sample_size rows, which are held back until the sample is complete. A later
+    cell wider than its column is written in full rather than cut short.
+    """
+
+    def __init__(self, out, columns, widths=None, sample_size=1000, batch_size=256):
+        super().__init__(out, columns, batch_size)
+        self.widths = list(widths) if widths else None
+        self.sample_size = sample_size
+        self._sample = [] if self.widths is None else None
+        if self.widths is not None:
+            self._lines.append(self.format_row(self.columns))
+
+    def write(self, row):
+        if self._sample is None:
+            return super().write(row)
+        self._sample.append(row)
+        self.count += 1
+        if len(self._sample) >= self.sample_size:
+            self._end_sample()
+
+    def _end_sample(self):
+        sample, self._sample = self._sample, None
+        self.widths = [max([len(str(column))] + [len(str(row[i])) for row in sample])
+                       for i, column in enumerate(self.columns)]
+        self._lines.append(self.format_row(self.columns))
+        self._lines.extend(self.format_row(row) for row in sample)
+        self.flush()
+
+    def flush(self):
+        if self._sample is None:
+            super().flush()
+
+    def close(self):
+        if self._sample is not None:
+            self._end_sample()
+        super().close()
+
+    def format_row(self, row):
+        return "  ".join(str(cell).ljust(self.widths[i]) for i, cell in enumerate(row)) + "\n"
+
+
+def parse_widths(text, columns):
+    """Declared column widths from "Name=20,Grade=6,Category=18"; unlisted columns get their header width"""
+    declared = {}
+    for part in text.split(","):
+        column, _, width = part.partition("=")
+        declared[column.strip().lower()] = int(width)
+    return [declared.get(column.lower(), len(column)) for column in columns]
+
+
+def table_writer(fmt, out=None, columns=("Name", "Grade", "Category"), widths=None, sample_size=1000):
+    """Writer for one of FORMATS"""
+    out = out or sys.stdout
+    if fmt == "text":
+        return TextWriter(out, columns, widths, sample_size)
+    if fmt == "jsonl":
+        return JsonLinesWriter(out, columns)
+    if fmt == "csv":
+        return CsvWriter(out, columns)
+    raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")